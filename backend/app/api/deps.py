@@ -5,11 +5,13 @@ import uuid
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.security import decode_token
 from app.db.models import User
-from app.db.session import SessionLocal
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.services import auth_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -22,7 +24,15 @@ def get_db():
         db.close()
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def user_id_from_token(token: str) -> uuid.UUID:
+    cached = auth_cache.tokens.get(token)
+    if cached is not None:
+        return cached
     try:
         payload = decode_token(token)
         sub = payload.get("sub")
@@ -31,10 +41,37 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
         user_id = uuid.UUID(sub)
     except (JWTError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
+    auth_cache.remember_token(token, user_id, payload.get("exp"))
+    return user_id
+
+
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+    user_id = user_id_from_token(token)
+    snapshot = auth_cache.users.get(user_id)
+    if snapshot is not None:
+        return snapshot.attach(db)
 
     user = db.get(User, user_id)
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="Inactive user")
+    auth_cache.users.set(user_id, auth_cache.UserSnapshot.of(user))
     return user
 
 
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
+) -> User:
+    """
+    get_current_user for async routes: same cache, user bound to the request's AsyncSession.
+    Relationships are not lazy-loadable on it; async routes only use the scalar columns.
+    """
+    user_id = user_id_from_token(token)
+    snapshot = auth_cache.users.get(user_id)
+    if snapshot is not None:
+        return await db.run_sync(snapshot.attach)
+
+    user = await db.get(User, user_id)
+    if not user or not user.is_active:
+        raise HTTPException(status_code=401, detail="Inactive user")
+    auth_cache.users.set(user_id, auth_cache.UserSnapshot.of(user))
+    return user
@@ -4,21 +4,30 @@ import os
 import logging
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db
-from app.core.security import create_access_token, hash_password, verify_password
+from app.api.deps import get_async_db, get_db
+from app.core.security import PasswordHasherBusy, create_access_token, password_hasher
 from app.db.models import Gender, Profile, User, UserInterest
 from app.schemas.auth import LoginRequest, TokenResponse
 from app.schemas.profile import INTERESTS_LIST
-from app.utils.images import save_upload
+from app.services import local_ranker
+from app.services.image_variants import image_variants
+from app.services.realtime import hub
+from app.utils.images import UploadTooLarge, save_upload
 from app.core.config import settings
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 logger = logging.getLogger(__name__)
 
 
+def _busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Server busy, try again", headers={"Retry-After": "1"})
+
+
 @router.post("/register", response_model=TokenResponse)
 def register(
     login: str = Form(..., min_length=3, max_length=64),
@@ -40,12 +49,21 @@ def register(
     if any(k not in INTERESTS_LIST for k in interest_keys):
         raise HTTPException(status_code=400, detail="Unknown interest in list")
 
-    photo_path = save_upload(settings.upload_dir, photo)
+    try:
+        password_hash = password_hasher.hash_blocking(password)
+    except PasswordHasherBusy:
+        raise _busy()
+
+    try:
+        photo_path = save_upload(settings.upload_dir, photo, settings.upload_max_bytes)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Photo too large")
     if not os.path.exists(photo_path):
         raise HTTPException(status_code=500, detail="Photo upload failed")
+    image_variants.submit(photo_path)
 
     try:
-        user = User(login=login, password_hash=hash_password(password))
+        user = User(login=login, password_hash=password_hash)
         user.profile = Profile(name=name, gender=gender, age=age, about=about, photo_path=photo_path)
         db.add(user)
         db.flush()
@@ -62,14 +80,25 @@ def register(
         logger.exception("Registration db error")
         raise HTTPException(status_code=500, detail="Registration failed (db error).")
 
+    hub.publish([], local_ranker.profile_event(user.id, age, sorted(set(interest_keys)), user.created_at))
     return TokenResponse(access_token=create_access_token(str(user.id)))
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(data: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.login == data.login).first()
-    if not user or not verify_password(data.password, user.password_hash):
+async def login(data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.login == data.login))
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        ok, new_hash = await password_hasher.verify_and_update(data.password, user.password_hash)
+    except PasswordHasherBusy:
+        raise _busy()
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash is not None:
+        # Hashed with older parameters (e.g. fewer rounds); store the upgraded hash.
+        user.password_hash = new_hash
+        await db.commit()
     return TokenResponse(access_token=create_access_token(str(user.id)))
 
 
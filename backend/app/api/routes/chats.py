@@ -1,51 +1,43 @@
 from __future__ import annotations
 
-import os
 import uuid
 from datetime import datetime
 
-from fastapi import Request
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from fastapi import Request, Response
+from fastapi import APIRouter, Depends, HTTPException, File, Query, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_async_db, get_current_user_async
 from app.core.config import settings
-from app.db.models import Chat, Message, Swipe, SwipeDirection, User, UserInterest
+from app.db.models import Chat, Message, SwipeDirection, User, UserInterest
 from app.schemas.chat import (
     AttachmentResponse,
     ChatListItem,
     MessageItem,
     SendMessageRequest,
+    SwipeBatchRequest,
+    SwipeBatchResponse,
     SwipeRequest,
     SwipeResponse,
 )
-from app.utils.images import save_upload
+from app.schemas.realtime import MatchItem, RealtimeEvent
+from app.services.chat_history import fetch_messages
+from app.services.chat_inbox import fetch_inbox, mark_read, record_message
+from app.services.image_variants import image_variants
+from app.services.realtime import hub
+from app.services.swipes import apply_swipe, apply_swipes, chat_pair
+from app.utils.cursor import decode_cursor
+from app.utils.images import UploadTooLarge, save_upload_async
+from app.utils.urls import static_url
 
 router = APIRouter(prefix="", tags=["chats"])
 
 
-def _photo_url(request: Request, photo_path: str) -> str:
-    name = os.path.basename(photo_path)
-    base = str(request.base_url).rstrip("/")
-    return f"{base}/static/{name}"
-
-
-def _static_url(request: Request, file_path: str) -> str:
-    name = os.path.basename(file_path)
-    base = str(request.base_url).rstrip("/")
-    return f"{base}/static/{name}"
-
-
-def _pair(a: uuid.UUID, b: uuid.UUID) -> tuple[uuid.UUID, uuid.UUID]:
-    return (a, b) if str(a) < str(b) else (b, a)
-
-
 @router.post("/swipe", response_model=SwipeResponse)
-def swipe(
+async def swipe(
     data: SwipeRequest,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if data.target_user_id == user.id:
         raise HTTPException(status_code=400, detail="Cannot swipe self")
@@ -53,78 +45,104 @@ def swipe(
         raise HTTPException(status_code=400, detail="Invalid direction")
 
     direction = SwipeDirection.right if data.direction == "right" else SwipeDirection.left
-
-    existing = (
-        db.query(Swipe)
-        .filter(Swipe.user_id == user.id, Swipe.target_user_id == data.target_user_id)
-        .first()
-    )
-    if existing:
-        existing.direction = direction
-        db.add(existing)
-    else:
-        db.add(Swipe(user_id=user.id, target_user_id=data.target_user_id, direction=direction))
-
-    created_chat_id: uuid.UUID | None = None
-    if direction == SwipeDirection.right:
-        a, b = _pair(user.id, data.target_user_id)
-        chat = db.query(Chat).filter(Chat.user_a_id == a, Chat.user_b_id == b).first()
-        if not chat:
-            chat = Chat(user_a_id=a, user_b_id=b)
-            db.add(chat)
-            db.flush()
-        created_chat_id = chat.id
-
-    db.commit()
-    return SwipeResponse(created_chat_id=created_chat_id)
+    result = await db.run_sync(apply_swipe, user.id, data.target_user_id, direction)
+    await db.commit()
+    if result.new_match:
+        match = MatchItem(chat_id=result.chat_id, user_ids=list(chat_pair(user.id, data.target_user_id)))
+        hub.publish(match.user_ids, RealtimeEvent(type="match", data=match).model_dump(mode="json"))
+    return SwipeResponse(created_chat_id=result.chat_id)
+
+
+@router.post("/swipes/batch", response_model=SwipeBatchResponse)
+async def swipe_batch(
+    data: SwipeBatchRequest,
+    user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Queued swipes from the client in one request and one transaction; all or nothing.
+    """
+    items: list[tuple[uuid.UUID, SwipeDirection]] = []
+    for i, item in enumerate(data.items):
+        if item.target_user_id == user.id:
+            raise HTTPException(status_code=400, detail=f"Item {i}: Cannot swipe self")
+        if item.direction not in {"left", "right"}:
+            raise HTTPException(status_code=400, detail=f"Item {i}: Invalid direction")
+        items.append((item.target_user_id, SwipeDirection(item.direction)))
+
+    results = await db.run_sync(apply_swipes, user.id, items)
+    await db.commit()
+    for (target_id, _), result in zip(items, results):
+        if result.new_match:
+            match = MatchItem(chat_id=result.chat_id, user_ids=list(chat_pair(user.id, target_id)))
+            hub.publish(match.user_ids, RealtimeEvent(type="match", data=match).model_dump(mode="json"))
+    return SwipeBatchResponse(results=[SwipeResponse(created_chat_id=r.chat_id) for r in results])
 
 
 @router.get("/chats", response_model=list[ChatListItem])
-def list_chats(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    chats = (
-        db.query(Chat)
-        .filter(or_(Chat.user_a_id == user.id, Chat.user_b_id == user.id))
-        .order_by(Chat.created_at.desc())
-        .all()
-    )
-
-    out: list[ChatListItem] = []
-    for c in chats:
-        other_id = c.user_b_id if c.user_a_id == user.id else c.user_a_id
-        other = db.get(User, other_id)
-        if not other or not other.profile:
-            continue
-        last = (
-            db.query(Message)
-            .filter(Message.chat_id == c.id)
-            .order_by(Message.created_at.desc())
-            .first()
-        )
-        out.append(
-            ChatListItem(
-                chat_id=c.id,
-                other_user_id=other_id,
-                other_name=other.profile.name,
-                other_photo_url=_photo_url(request, other.profile.photo_path),
-                last_message=last.text if last else None,
-                last_message_at=last.created_at if last else None,
-            )
+async def list_chats(
+    request: Request,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = None,
+    user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    rows, next_cursor = await db.run_sync(fetch_inbox, user.id, limit, after)
+    # The body stays a plain list for existing clients; the next page cursor goes into a header.
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return [
+        ChatListItem(
+            chat_id=r.chat_id,
+            other_user_id=r.other_user_id,
+            other_name=r.other_name,
+            other_photo_url=static_url(request, r.other_photo_path),
+            other_photo_urls=image_variants.urls(request, r.other_photo_path),
+            last_message=r.last_message,
+            last_message_at=r.last_message_at,
+            unread_count=r.unread_count,
         )
-    return out
+        for r in rows
+    ]
 
 
 @router.get("/chats/{chat_id}/messages", response_model=list[MessageItem])
-def list_messages(chat_id: uuid.UUID, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    chat = db.get(Chat, chat_id)
+async def list_messages(
+    chat_id: uuid.UUID,
+    limit: int = Query(default=100, ge=1, le=500),
+    before: uuid.UUID | None = Query(default=None, description="Message id: return older messages"),
+    after: uuid.UUID | None = Query(default=None, description="Message id: return newer messages"),
+    since: datetime | None = Query(
+        default=None, description="Incremental sync: messages created at or after this time (dedupe by id)"
+    ),
+    user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    chat = await db.get(Chat, chat_id)
     if not chat or user.id not in {chat.user_a_id, chat.user_b_id}:
         raise HTTPException(status_code=404, detail="Chat not found")
-
-    msgs = (
-        db.query(Message)
-        .filter(Message.chat_id == chat_id)
-        .order_by(Message.created_at.asc())
-        .all()
-    )
+    if before is not None and (after is not None or since is not None):
+        raise HTTPException(status_code=400, detail="Use either before or after/since")
+
+    async def _cursor(message_id: uuid.UUID | None) -> tuple[datetime, uuid.UUID] | None:
+        if message_id is None:
+            return None
+        m = await db.get(Message, message_id)
+        if not m or m.chat_id != chat_id:
+            raise HTTPException(status_code=400, detail="Unknown cursor message")
+        return m.created_at, m.id
+
+    before_key, after_key = await _cursor(before), await _cursor(after)
+    msgs = await db.run_sync(fetch_messages, chat_id, limit, before_key, after_key, since)
     return [
         MessageItem(
             id=m.id,
@@ -138,38 +156,60 @@ def list_messages(chat_id: uuid.UUID, user: User = Depends(get_current_user), db
 
 
 @router.post("/chats/{chat_id}/messages", response_model=MessageItem)
-def send_message(
+async def send_message(
     chat_id: uuid.UUID,
     data: SendMessageRequest,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    chat = db.get(Chat, chat_id)
+    chat = await db.get(Chat, chat_id)
     if not chat or user.id not in {chat.user_a_id, chat.user_b_id}:
         raise HTTPException(status_code=404, detail="Chat not found")
     if not data.text.strip():
         raise HTTPException(status_code=400, detail="Empty message")
 
+    participants = [chat.user_a_id, chat.user_b_id]
     m = Message(chat_id=chat_id, sender_id=user.id, text=data.text.strip())
     db.add(m)
-    db.commit()
-    db.refresh(m)
-    return MessageItem(id=m.id, chat_id=m.chat_id, sender_id=m.sender_id, text=m.text, created_at=m.created_at)
+    await db.flush()
+    await db.run_sync(record_message, chat, m)
+    await db.commit()
+    await db.refresh(m)
+    item = MessageItem(id=m.id, chat_id=m.chat_id, sender_id=m.sender_id, text=m.text, created_at=m.created_at)
+    hub.publish(participants, RealtimeEvent(type="message", data=item).model_dump(mode="json"))
+    return item
+
+
+@router.post("/chats/{chat_id}/read", status_code=204)
+async def read_chat(
+    chat_id: uuid.UUID,
+    user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    chat = await db.get(Chat, chat_id)
+    if not chat or user.id not in {chat.user_a_id, chat.user_b_id}:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    await db.run_sync(mark_read, chat, user.id)
+    await db.commit()
 
 
 @router.post("/chats/{chat_id}/attachments", response_model=AttachmentResponse)
-def upload_attachment(
+async def upload_attachment(
     request: Request,
     chat_id: uuid.UUID,
     file: UploadFile = File(...),
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    chat = db.get(Chat, chat_id)
+    chat = await db.get(Chat, chat_id)
     if not chat or user.id not in {chat.user_a_id, chat.user_b_id}:
         raise HTTPException(status_code=404, detail="Chat not found")
 
-    path = save_upload(settings.upload_dir, file)
-    return AttachmentResponse(url=_static_url(request, path), name=file.filename or "file", mime=file.content_type)
+    try:
+        path = await save_upload_async(settings.upload_dir, file, settings.upload_max_bytes)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="File too large")
+    return AttachmentResponse(url=static_url(request, path), name=file.filename or "file", mime=file.content_type)
 
 
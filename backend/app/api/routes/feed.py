@@ -1,75 +1,83 @@
 from __future__ import annotations
 
-import os
-import uuid
-
 from fastapi import Request
-from fastapi import APIRouter, Depends
-from sqlalchemy import and_, not_, select
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_async_db, get_current_user_async
 from app.core.config import settings
-from app.db.models import Profile, Swipe, User, UserInterest
+from app.db.models import Gender, User
 from app.schemas.feed import FeedResponse
-from app.schemas.profile import ProfilePublic
-from app.services.reco_client import RecoClient
+from app.schemas.profile import INTERESTS_LIST
+from app.services.feed_candidates import FeedFilters, fetch_candidates
+from app.services.feed_queue import feed_refiller, read_queue
+from app.services.feed_ranking import rank_for_user
+from app.services.profiles import hydrate_profiles
+from app.utils.cursor import decode_cursor, decode_position_cursor
 
 router = APIRouter(prefix="", tags=["feed"])
 
 
-def _photo_url(request: Request, photo_path: str) -> str:
-    name = os.path.basename(photo_path)
-    base = str(request.base_url).rstrip("/")
-    return f"{base}/static/{name}"
+def _interest_keys(raw: str | None) -> tuple[str, ...]:
+    keys = tuple(dict.fromkeys(x.strip() for x in (raw or "").split(",") if x.strip()))
+    if any(k not in INTERESTS_LIST for k in keys):
+        raise HTTPException(status_code=400, detail="Unknown interest in list")
+    return keys
 
 
 @router.get("/feed", response_model=FeedResponse)
 async def get_feed(
     request: Request,
-    limit: int = 20,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+    min_age: int | None = Query(default=None, ge=18, le=99),
+    max_age: int | None = Query(default=None, ge=18, le=99),
+    gender: list[Gender] | None = Query(default=None, description="Repeat to allow several genders"),
+    interests: str | None = Query(default=None, description="Comma-separated interest keys, all required"),
+    interests_any: str | None = Query(default=None, description="Comma-separated interest keys, at least one"),
+    user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    # Exclude already swiped users
-    swiped_ids = {
-        row[0]
-        for row in db.execute(select(Swipe.target_user_id).where(Swipe.user_id == user.id)).all()
-    }
-
-    q = (
-        db.query(User)
-        .join(Profile, Profile.user_id == User.id)
-        .filter(and_(User.id != user.id, not_(User.id.in_(swiped_ids))))
-        .order_by(User.created_at.desc())
-        .limit(limit * 3)
+    if min_age is not None and max_age is not None and min_age > max_age:
+        raise HTTPException(status_code=400, detail="min_age is greater than max_age")
+    filters = FeedFilters(
+        min_age=min_age,
+        max_age=max_age,
+        genders=tuple(dict.fromkeys(gender or ())),
+        interests_all=_interest_keys(interests),
+        interests_any=_interest_keys(interests_any),
     )
-    candidates = q.all()
 
-    candidate_ids = [u.id for u in candidates]
-    if settings.reco_service_url:
+    # Two cursor kinds: positions in the precomputed queue, or (created_at, id) keysets of the
+    # direct path. Each one keeps paging on the path that issued it. Filtered feeds always take
+    # the direct path (the queue is unfiltered) and must be sent with the same filters per page;
+    # with the queue disabled a queue cursor cannot be continued either.
+    after = after_position = None
+    if cursor:
         try:
-            ranked = await RecoClient(settings.reco_service_url).rank_candidates(user.id, candidate_ids)
-            id_to_user = {u.id: u for u in candidates}
-            candidates = [id_to_user[i] for i in ranked if i in id_to_user]
-        except Exception:
-            pass
+            after_position = decode_position_cursor(cursor)
+        except ValueError:
+            try:
+                after = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        if after_position is not None and (filters or not settings.feed_queue_enabled):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if settings.feed_queue_enabled and after is None and not filters:
+        ids, next_cursor, depth = await db.run_sync(read_queue, user.id, limit, after_position)
+        if depth < settings.feed_queue_low_water:
+            feed_refiller.request(user.id)
+        if ids or after_position is not None:
+            out = await db.run_sync(hydrate_profiles, request, ids)
+            return FeedResponse(users=out, next_cursor=next_cursor)
+        # Cold queue (first visit, or everything swiped): serve this page directly.
+
+    # Already swiped users are excluded in SQL; ranking reorders the page only.
+    candidates, next_cursor = await db.run_sync(fetch_candidates, user.id, limit, after, filters)
+    ranked = await rank_for_user(user.id, [u.id for u in candidates])
 
-    out: list[ProfilePublic] = []
-    for u in candidates[:limit]:
-        profile = u.profile
-        interests = [x[0] for x in db.query(UserInterest.interest_key).filter(UserInterest.user_id == u.id).all()]
-        out.append(
-            ProfilePublic(
-                user_id=u.id,
-                name=profile.name,
-                gender=profile.gender.value,
-                age=profile.age,
-                about=profile.about,
-                photo_url=_photo_url(request, profile.photo_path),
-                interests=interests,
-            )
-        )
-    return FeedResponse(users=out)
+    out = await db.run_sync(hydrate_profiles, request, ranked[:limit])
+    return FeedResponse(users=out, next_cursor=next_cursor)
 
 
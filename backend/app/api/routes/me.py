@@ -1,7 +1,5 @@
 from __future__ import annotations
 
-import os
-
 from fastapi import Request
 from fastapi import APIRouter, Depends, File, Form, UploadFile
 from fastapi import HTTPException
@@ -11,30 +9,21 @@ from app.api.deps import get_db, get_current_user
 from app.core.config import settings
 from app.db.models import Gender, Profile, User, UserInterest
 from app.schemas.profile import INTERESTS_LIST, ProfilePublic
-from app.utils.images import save_upload
+from app.services import feed_queue, local_ranker, ranking_cache
+from app.services.image_variants import image_variants
+from app.services.profiles import hydrate_profile
+from app.services.realtime import hub
+from app.utils.images import UploadTooLarge, save_upload
 
 router = APIRouter(prefix="/me", tags=["me"])
 
 
-def _photo_url(request: Request, photo_path: str) -> str:
-    name = os.path.basename(photo_path)
-    base = str(request.base_url).rstrip("/")
-    return f"{base}/static/{name}"
-
-
 @router.get("", response_model=ProfilePublic)
 def get_me(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    profile = user.profile
-    interests = [ui.interest_key for ui in db.query(UserInterest).filter(UserInterest.user_id == user.id).all()]
-    return ProfilePublic(
-        user_id=user.id,
-        name=profile.name,
-        gender=profile.gender.value,
-        age=profile.age,
-        about=profile.about,
-        photo_url=_photo_url(request, profile.photo_path),
-        interests=interests,
-    )
+    out = hydrate_profile(db, request, user.id)
+    if out is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return out
 
 
 @router.put("", response_model=ProfilePublic)
@@ -49,7 +38,10 @@ def update_me(
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    profile: Profile = user.profile
+    profile: Profile | None = user.profile
+    if profile is None:
+        # User deleted while its session was still cached (see auth_cache).
+        raise HTTPException(status_code=404, detail="Profile not found")
     if name is not None:
         profile.name = name
     if gender is not None:
@@ -59,7 +51,11 @@ def update_me(
     if about is not None:
         profile.about = about
     if photo is not None:
-        profile.photo_path = save_upload(settings.upload_dir, photo)
+        try:
+            profile.photo_path = save_upload(settings.upload_dir, photo, settings.upload_max_bytes)
+        except UploadTooLarge:
+            raise HTTPException(status_code=413, detail="Photo too large")
+        image_variants.submit(profile.photo_path)
 
     if interests is not None:
         keys = [x.strip() for x in interests.split(",") if x.strip()]
@@ -68,18 +64,20 @@ def update_me(
         db.query(UserInterest).filter(UserInterest.user_id == user.id).delete()
         db.add_all([UserInterest(user_id=user.id, interest_key=k) for k in set(keys)])
 
+    # The queued feed was ranked for the old profile; the next feed read refills it.
+    feed_queue.clear(db, user.id)
+
+    created_at = user.created_at
     db.add(profile)
     db.commit()
 
-    interests_out = [ui.interest_key for ui in db.query(UserInterest).filter(UserInterest.user_id == user.id).all()]
-    return ProfilePublic(
-        user_id=user.id,
-        name=profile.name,
-        gender=profile.gender.value,
-        age=profile.age,
-        about=profile.about,
-        photo_url=_photo_url(request, profile.photo_path),
-        interests=interests_out,
-    )
+    # What the ranker knows about this viewer changed; its cached ordering is stale in every worker.
+    ranking_cache.invalidate_user(user.id)
+    hub.publish([], ranking_cache.invalidation_event([user.id]))
+
+    out = hydrate_profile(db, request, user.id)
+    if out is not None and (age is not None or interests is not None):
+        hub.publish([], local_ranker.profile_event(user.id, out.age, out.interests, created_at))
+    return out
 
 
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException
+
+from app.core import metrics
+from app.core.config import settings
+
+router = APIRouter(prefix="", tags=["metrics"])
+
+
+@router.get("/metrics")
+def get_metrics() -> dict:
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return metrics.snapshot()
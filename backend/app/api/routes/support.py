@@ -1,63 +1,93 @@
 from __future__ import annotations
 
+import asyncio
+import json
+
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_async_db, get_current_user_async
 from app.db.models import SupportMessage, User
 from app.schemas.support import (
     SendSupportMessageRequest,
     SendSupportMessageResponse,
     SupportMessageItem,
 )
-from app.services.gigachat_client import GigaChatClient
+from app.services.support_pipeline import support_pipeline
 
 router = APIRouter(prefix="/support", tags=["support"])
 
 
 @router.get("/messages", response_model=list[SupportMessageItem])
-def list_support_messages(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    msgs = (
-        db.query(SupportMessage)
-        .filter(SupportMessage.user_id == user.id)
+async def list_support_messages(
+    user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    msgs = await db.scalars(
+        select(SupportMessage)
+        .where(SupportMessage.user_id == user.id)
         .order_by(SupportMessage.created_at.asc())
-        .all()
     )
     return [SupportMessageItem(id=m.id, role=m.role, text=m.text, created_at=m.created_at) for m in msgs]
 
 
+async def _save_user_message(db: AsyncSession, user: User, raw: str | None) -> SupportMessageItem:
+    text = (raw or "").strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="Empty message")
+    msg = SupportMessage(user_id=user.id, role="user", text=text)
+    db.add(msg)
+    # Commit before the model runs: nothing is held open while it thinks.
+    await db.commit()
+    await db.refresh(msg)
+    return SupportMessageItem(id=msg.id, role=msg.role, text=msg.text, created_at=msg.created_at)
+
+
 @router.post("/messages", response_model=SendSupportMessageResponse)
-def send_support_message(
+async def send_support_message(
     data: SendSupportMessageRequest,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    text = (data.text or "").strip()
-    if not text:
-        raise HTTPException(status_code=400, detail="Empty message")
+    user_message = await _save_user_message(db, user, data.text)
+    reply = support_pipeline.start(user.id, user_message.text)
+    # shield: a client that hangs up must not cancel the reply, it is still saved to history.
+    assistant_message = await asyncio.shield(reply.task)
+    return SendSupportMessageResponse(user_message=user_message, assistant_message=assistant_message)
 
-    user_msg = SupportMessage(user_id=user.id, role="user", text=text)
-    db.add(user_msg)
-    db.flush()
-
-    answer = GigaChatClient().ask_support(text)
-    assistant_msg = SupportMessage(user_id=user.id, role="assistant", text=answer.text)
-    db.add(assistant_msg)
-    db.commit()
-
-    db.refresh(user_msg)
-    db.refresh(assistant_msg)
-
-    return SendSupportMessageResponse(
-        user_message=SupportMessageItem(
-            id=user_msg.id, role=user_msg.role, text=user_msg.text, created_at=user_msg.created_at
-        ),
-        assistant_message=SupportMessageItem(
-            id=assistant_msg.id,
-            role=assistant_msg.role,
-            text=assistant_msg.text,
-            created_at=assistant_msg.created_at,
-        ),
-    )
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
 
 
+@router.post("/messages/stream")
+async def stream_support_message(
+    data: SendSupportMessageRequest,
+    user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Server-Sent Events: `user_message` (saved item), `delta` ({"text": piece}) as the reply is
+    generated, then `assistant_message` (saved item) or `error`.
+    """
+    user_message = await _save_user_message(db, user, data.text)
+    reply = support_pipeline.start(user.id, user_message.text)
+
+    async def events():
+        yield _sse("user_message", user_message.model_dump_json())
+        async for kind, payload in reply.events():
+            if kind == "delta":
+                yield _sse("delta", json.dumps({"text": payload}, ensure_ascii=False))
+            elif kind == "done":
+                yield _sse("assistant_message", payload.model_dump_json())
+            else:
+                yield _sse("error", json.dumps({"detail": payload}))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: let nginx-style proxies pass pieces through as they come.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
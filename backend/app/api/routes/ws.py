@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+
+from app.api.deps import user_id_from_token
+from app.db.models import User
+from app.db.session import AsyncSessionLocal
+from app.services.realtime import hub
+
+router = APIRouter(prefix="", tags=["realtime"])
+
+
+async def _active_user_id(token: str) -> uuid.UUID | None:
+    try:
+        user_id = user_id_from_token(token)
+    except HTTPException:
+        return None
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        return user.id if user and user.is_active else None
+
+
+@router.websocket("/ws")
+async def events(websocket: WebSocket, token: str | None = None):
+    """
+    Server -> client event stream (RealtimeEvent JSON: new messages and matches).
+    Auth: the same JWT as the REST API, as `?token=` or `Authorization: Bearer`.
+    Anything the client sends is ignored (it may be used as keep-alive).
+    """
+    if not token:
+        scheme, _, value = websocket.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer":
+            token = value.strip()
+    user_id = await _active_user_id(token) if token else None
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    queue = hub.subscribe(user_id)
+
+    async def pump() -> None:
+        while True:
+            await websocket.send_json(await queue.get())
+
+    sender = asyncio.create_task(pump())
+    try:
+        while True:
+            # Text or binary, the payload is ignored; only the disconnect matters.
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        hub.unsubscribe(user_id, queue)
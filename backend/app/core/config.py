@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -9,21 +11,80 @@ class Settings(BaseSettings):
     app_name: str = "twinby-mvp"
     env: str = "dev"
     public_base_url: str = "http://localhost:8080"
+    # Media URLs are built from the request's base URL unless one of these is set: a CDN prefix
+    # that maps to /static (wins), or public_base_url + "/static" for a reverse proxy.
+    media_cdn_url: str | None = None
+    media_use_public_base_url: bool = False
+    # nginx internal location mapped to upload_dir; /static then only sends X-Accel-Redirect.
+    media_accel_redirect_prefix: str | None = None
 
     jwt_secret: str = "change_me_please"
     jwt_expires_min: int = 60 * 24 * 7
+    # PBKDF2-SHA256 cost; hashes made with another value are upgraded on the user's next login.
+    password_pbkdf2_rounds: int = 29000
+    # Hashing runs in this many processes per API worker; beyond password_hash_queue waiting or
+    # running operations, login/register answer 503.
+    password_hash_workers: int = 2
+    password_hash_queue: int = 64
+    # Decoded tokens / active users cached per worker to skip the user SELECT on every request.
+    auth_cache_ttl_s: int = 30
+    auth_cache_size: int = 10_000
 
     # Default to local persistent SQLite for easy local run (Docker/Postgres overrides via env)
     database_url: str = "sqlite:///./twinby.db"
+    # Connection pool (per engine; the API has a sync and an async engine, so up to twice this).
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_s: float = 30
+    db_pool_recycle_s: int = -1
+    db_pre_ping: bool = True
+    # 0: ping on every checkout; >0: ping a connection at most once per this many seconds.
+    db_pre_ping_interval_s: int = 0
     # Local run: store uploads inside project folder; Docker overrides to /app/uploads
     upload_dir: str = "./uploads"
+    # Larger photos and attachments are rejected with 413 while being copied.
+    upload_max_bytes: int = 10 * 1024 * 1024
+    # Resized, EXIF-free photo copies rendered by image_workers processes per API worker.
+    image_variants_enabled: bool = True
+    image_variant_format: Literal["webp", "jpeg"] = "webp"
+    image_variant_quality: int = 80
+    image_workers: int = 2
 
     reco_service_url: str | None = None
+    # Deadline for one ranking call; past it the feed falls back to recency order.
+    reco_timeout_ms: int = 300
+    reco_breaker_failures: int = 5
+    reco_breaker_reset_s: int = 30
+    # Last ranking per viewer, reused while the candidate set does not grow (pull-to-refresh).
+    reco_cache_ttl_s: int = 300
+    reco_cache_size: int = 10_000
+    # In-process ranker used when the reco service is not configured or unavailable; its profile
+    # index picks up users created outside the API every local_ranker_sync_s seconds.
+    local_ranker_enabled: bool = True
+    local_ranker_sync_s: int = 60
+    # Per-user precomputed feed: ranked in batches of up to feed_queue_size by a background
+    # worker, refilled when fewer than feed_queue_low_water entries are left.
+    feed_queue_enabled: bool = True
+    feed_queue_size: int = 200
+    feed_queue_low_water: int = 50
 
     gigachat_credentials: str | None = None
     gigachat_scope: str = "GIGACHAT_API_PERS"
     gigachat_model: str = "GigaChat-2-Pro"
     gigachat_verify_ssl: bool = True
+    # Concurrent model calls per worker; extra requests wait up to gigachat_queue_timeout_s.
+    gigachat_max_concurrency: int = 4
+    gigachat_queue_timeout_s: float = 15
+
+    # Near-duplicate support questions are answered from earlier replies (cosine similarity
+    # of character trigram TF-IDF vectors >= threshold) instead of calling the model.
+    support_cache_enabled: bool = True
+    support_cache_threshold: float = 0.8
+    support_cache_ttl_s: int = 7 * 24 * 3600
+    support_cache_size: int = 2000
+
+    # GET /metrics is unauthenticated: enable it only where the port is not public.
+    metrics_enabled: bool = False
 
 
 settings = Settings()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+_sources: dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, source: Callable[[], dict]) -> None:
+    """
+    Registers a callable returning a JSON-serializable dict of counters, exposed by GET /metrics.
+    """
+    _sources[name] = source
+
+
+def snapshot() -> dict:
+    out: dict = {}
+    for name, source in _sources.items():
+        try:
+            out[name] = source()
+        except Exception:
+            logger.exception("Metrics source %s failed", name)
+    return out
+
+
+class Histogram:
+    """
+    Per-bucket (non-cumulative) counts plus count/avg/max. `buckets` are inclusive upper bounds;
+    the last, open-ended bucket is reported as "inf".
+    """
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            self._counts[i] += 1
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "count": self._count,
+                "avg": round(self._sum / self._count, 3) if self._count else 0.0,
+                "max": round(self._max, 3),
+                "buckets": {
+                    **{f"le_{b:g}": n for b, n in zip(self.buckets, self._counts)},
+                    "inf": self._counts[-1],
+                },
+            }
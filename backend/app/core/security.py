@@ -1,16 +1,39 @@
 from __future__ import annotations
 
+import asyncio
+import functools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta, timezone
 
 from jose import jwt
 from passlib.context import CryptContext
 
+from app.core import metrics
 from app.core.config import settings
 
-# bcrypt backend часто ломается из‑за несовместимых версий нативной библиотеки.
-# Для MVP используем PBKDF2 (стабильно, без нативных зависимостей).
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 ALGORITHM = "HS256"
+HASH_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+@functools.lru_cache(maxsize=4)
+def _context(rounds: int) -> CryptContext:
+    # bcrypt backend часто ломается из‑за несовместимых версий нативной библиотеки.
+    # Для MVP используем PBKDF2 (стабильно, без нативных зависимостей).
+    # min = max = default: a stored hash with any other round count needs an update.
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds,
+        pbkdf2_sha256__max_rounds=rounds,
+    )
+
+
+pwd_context = _context(settings.password_pbkdf2_rounds)
 
 
 def hash_password(password: str) -> str:
@@ -21,6 +44,108 @@ def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
 
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, password_hash: str, rounds: int) -> tuple[bool, str | None]:
+    return _context(rounds).verify_and_update(password, password_hash)
+
+
+class PasswordHasherBusy(RuntimeError):
+    pass
+
+
+class PasswordHasher:
+    """
+    Runs PBKDF2 in a small process pool instead of the request thread; past
+    `password_hash_queue` pending operations callers get PasswordHasherBusy (503) right away.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self.duration_ms = metrics.Histogram(HASH_BUCKETS_MS)
+        self.counters = {"hashed": 0, "verified": 0, "rehashed": 0, "rejected_busy": 0, "max_pending": 0}
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= settings.password_hash_queue:
+                self.counters["rejected_busy"] += 1
+                raise PasswordHasherBusy("Password hashing queue is full")
+            if self._pool is None:
+                # spawn: forking a process that runs an event loop and DB pools is not safe.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=settings.password_hash_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            self._pending += 1
+            self.counters["max_pending"] = max(self.counters["max_pending"], self._pending)
+            pool = self._pool
+        t0 = time.perf_counter()
+        try:
+            future = pool.submit(fn, *args)
+        except BaseException as exc:
+            self._release(pool, t0, exc)
+            raise
+        future.add_done_callback(lambda f: self._release(pool, t0, None if f.cancelled() else f.exception()))
+        return future
+
+    def _release(self, pool: ProcessPoolExecutor, t0: float, exc: BaseException | None) -> None:
+        self.duration_ms.observe((time.perf_counter() - t0) * 1000)
+        with self._lock:
+            self._pending -= 1
+            # A killed worker breaks the whole pool for good; the next call starts a new one.
+            if isinstance(exc, BrokenProcessPool) and self._pool is pool:
+                self._pool = None
+
+    def hash_blocking(self, password: str) -> str:
+        """
+        For sync routes: waits in the calling thread, the CPU work happens in the pool.
+        """
+        digest = self._submit(_hash, password, settings.password_pbkdf2_rounds).result()
+        self.counters["hashed"] += 1
+        return digest
+
+    async def hash(self, password: str) -> str:
+        future = self._submit(_hash, password, settings.password_pbkdf2_rounds)
+        digest = await asyncio.wrap_future(future)
+        self.counters["hashed"] += 1
+        return digest
+
+    async def verify_and_update(self, password: str, password_hash: str) -> tuple[bool, str | None]:
+        """
+        (password matches, new hash or None). A new hash is returned when `password_hash` was
+        made with other parameters than the current settings (e.g. PASSWORD_PBKDF2_ROUNDS was
+        changed); the caller stores it, so hashes are upgraded on login without a reset.
+        """
+        future = self._submit(_verify_and_update, password, password_hash, settings.password_pbkdf2_rounds)
+        ok, new_hash = await asyncio.wrap_future(future)
+        self.counters["verified"] += 1
+        if new_hash is not None:
+            self.counters["rehashed"] += 1
+        return ok, new_hash
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "pending": self._pending,
+            "rounds": settings.password_pbkdf2_rounds,
+            "duration_ms": self.duration_ms.snapshot(),
+        }
+
+
+password_hasher = PasswordHasher()
+
+metrics.register("password_hasher", password_hasher.stats)
+
+
 def create_access_token(subject: str) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.jwt_expires_min)
     to_encode = {"sub": subject, "exp": expire}
@@ -29,5 +154,3 @@ def create_access_token(subject: str) -> str:
 
 def decode_token(token: str) -> dict:
     return jwt.decode(token, settings.jwt_secret, algorithms=[ALGORITHM])
-
-
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+from sqlalchemy import Column, inspect
 from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn, DefaultClause
 
 from app.db.models import Base, Interest
 from app.db.session import engine
@@ -19,6 +21,41 @@ INTERESTS_LIST = [
 
 def create_tables() -> None:
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    # create_all() skips tables that already exist, so indexes added to the models later
+    # would never reach an existing database. Create them one by one instead.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def add_missing_columns() -> None:
+    """
+    Additive schema drift only: columns added to existing models are created with ALTER TABLE.
+    Data for them is filled by the matching backfill script under app/scripts/ (the chat
+    summary columns are also backfilled on API startup, see chat_inbox.backfill_missing_summaries).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if _has_expression_default(column):
+                    # An expression default (e.g. now()) would give every existing row the deploy
+                    # time (SQLite cannot add one at all): such a column is added nullable and
+                    # without a default, so its backfill can find the rows it has to fill.
+                    column = Column(column.name, column.type, nullable=True)
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+
+
+def _has_expression_default(column: Column) -> bool:
+    default = column.server_default
+    return isinstance(default, DefaultClause) and not isinstance(default.arg, str)
 
 
 def seed_interests(db: Session) -> None:
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.metrics import Histogram
+
+# Upper bounds (ms) of the checkout wait histogram; the last bucket is open-ended.
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.timeouts = 0
+        self.wait_ms = Histogram(WAIT_BUCKETS_MS)
+        self.peak_checked_out = 0
+
+    def record_wait(self, wait_ms: float, checked_out: int, timed_out: bool) -> None:
+        if timed_out:
+            with self._lock:
+                self.timeouts += 1
+            return
+        self.wait_ms.observe(wait_ms)
+        with self._lock:
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def snapshot(self, pool: Pool) -> dict:
+        with self._lock:
+            out = {"timeouts": self.timeouts, "peak_checked_out": self.peak_checked_out}
+        out["wait_ms"] = self.wait_ms.snapshot()
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            out.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow(),
+                # > 1.0 is impossible; at 1.0 new checkouts wait up to pool_timeout.
+                saturation=round(pool.checkedout() / capacity, 3) if capacity > 0 else 0.0,
+            )
+        return out
+
+
+class _WaitTimingMixin:
+    """
+    Times how long a checkout waits for a free connection; this is the pool-starvation signal.
+    """
+
+    stats: PoolStats
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_wait((time.perf_counter() - t0) * 1000, self.checkedout(), timed_out=True)
+            raise
+        self.stats.record_wait((time.perf_counter() - t0) * 1000, self.checkedout(), timed_out=False)
+        return conn
+
+
+def instrumented_pool_class(base: type[QueuePool]) -> type[QueuePool]:
+    """
+    Pool subclass with its own PoolStats (one per engine).
+    """
+    return type(f"Instrumented{base.__name__}", (_WaitTimingMixin, base), {"stats": PoolStats()})
+
+
+InstrumentedQueuePool = instrumented_pool_class(QueuePool)
+InstrumentedAsyncQueuePool = instrumented_pool_class(AsyncAdaptedQueuePool)
+
+
+def install_pre_ping_interval(engine: Engine, interval_s: int) -> None:
+    """
+    Pessimistic disconnect handling like pool_pre_ping, but a connection is pinged at most once per
+    `interval_s` instead of on every checkout.
+    """
+
+    @event.listens_for(engine.pool, "checkout")
+    def _ping(dbapi_connection, connection_record, connection_proxy):
+        now = time.monotonic()
+        last = connection_record.info.get("last_ping", 0.0)
+        if now - last < interval_s:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            # The pool retries the checkout with a fresh connection.
+            raise exc.DisconnectionError()
+        finally:
+            cursor.close()
+        connection_record.info["last_ping"] = now
+
+    @event.listens_for(engine.pool, "connect")
+    def _fresh(dbapi_connection, connection_record):
+        connection_record.info["last_ping"] = time.monotonic()
+
+
+@dataclass
+class RequestDbStats:
+    queries: int = 0
+    db_ms: float = 0.0
+
+
+_current: contextvars.ContextVar[RequestDbStats | None] = contextvars.ContextVar("request_db_stats", default=None)
+
+
+def begin_request() -> contextvars.Token:
+    """
+    Starts counting queries for the current request. The stats object is shared by reference, so
+    queries made from threadpool workers (which run in a copy of the context) are counted too.
+    """
+    return _current.set(RequestDbStats())
+
+
+def end_request(token: contextvars.Token) -> RequestDbStats:
+    stats = _current.get() or RequestDbStats()
+    _current.reset(token)
+    return stats
+
+
+def install_query_counter(engine: Engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_ms += (time.perf_counter() - started) * 1000
+
+
+class RouteStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routes: dict[str, dict] = {}
+
+    def record(self, route: str, stats: RequestDbStats, total_ms: float) -> None:
+        with self._lock:
+            r = self._routes.setdefault(
+                route, {"requests": 0, "queries": 0, "max_queries": 0, "db_ms": 0.0, "total_ms": 0.0}
+            )
+            r["requests"] += 1
+            r["queries"] += stats.queries
+            r["max_queries"] = max(r["max_queries"], stats.queries)
+            r["db_ms"] += stats.db_ms
+            r["total_ms"] += total_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                route: {
+                    "requests": r["requests"],
+                    "queries_avg": round(r["queries"] / r["requests"], 2),
+                    "queries_max": r["max_queries"],
+                    "db_ms_avg": round(r["db_ms"] / r["requests"], 3),
+                    "total_ms_avg": round(r["total_ms"] / r["requests"], 3),
+                }
+                for route, r in self._routes.items()
+            }
+
+
+route_stats = RouteStats()
+
+
+class DbStatsMiddleware:
+    """
+    Per-request query count and DB time for GET /metrics, plus X-DB-Queries on responses of
+    requests that ran queries. Plain ASGI, so streaming and file responses pass through untouched.
+    """
+
+    def __init__(self, app, exclude_prefixes: tuple[str, ...] = ()) -> None:
+        self.app = app
+        self.exclude_prefixes = exclude_prefixes
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        token = begin_request()
+        stats = _current.get()
+        t0 = time.perf_counter()
+
+        async def send_with_header(message) -> None:
+            if message["type"] == "http.response.start" and stats.queries:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.queries).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            end_request(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            route_stats.record(f"{scope['method']} {path}", stats, (time.perf_counter() - t0) * 1000)
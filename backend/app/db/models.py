@@ -2,13 +2,14 @@ from __future__ import annotations
 
 import enum
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 
 from sqlalchemy import (
     Boolean,
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -18,6 +19,23 @@ from sqlalchemy import (
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+# SQLite's CURRENT_TIMESTAMP has whole seconds only, so rows written in the same second would be
+# ordered by their random uuid. Creation times are therefore set on the Python side (microseconds,
+# stored as "YYYY-MM-DD HH:MM:SS.ffffff", the format keyset cursors bind); server_default only
+# covers rows inserted outside the ORM.
+Timestamp = DateTime(timezone=True)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def epoch_seconds(ts: datetime) -> float:
+    # SQLite hands back naive datetimes; they are UTC (server-side now()).
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
 
 class Base(DeclarativeBase):
     pass
@@ -36,12 +54,14 @@ class SwipeDirection(str, enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    # Feed keyset pagination: ORDER BY created_at DESC, id DESC.
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
 
     id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     login: Mapped[str] = mapped_column(String(64), unique=True, index=True)
     password_hash: Mapped[str] = mapped_column(String(255))
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(Timestamp, default=utcnow, server_default=func.now())
 
     profile: Mapped["Profile"] = relationship(back_populates="user", uselist=False, cascade="all, delete-orphan")
     interests: Mapped[list["UserInterest"]] = relationship(back_populates="user", cascade="all, delete-orphan")
@@ -49,6 +69,8 @@ class User(Base):
 
 class Profile(Base):
     __tablename__ = "profiles"
+    # Feed filters: gender equality + age range.
+    __table_args__ = (Index("ix_profiles_gender_age", "gender", "age"),)
 
     user_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("users.id"), primary_key=True)
     name: Mapped[str] = mapped_column(String(64))
@@ -68,7 +90,11 @@ class Interest(Base):
 
 class UserInterest(Base):
     __tablename__ = "user_interests"
-    __table_args__ = (UniqueConstraint("user_id", "interest_key", name="uq_user_interest"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "interest_key", name="uq_user_interest"),
+        # Feed interest filters: EXISTS (... WHERE interest_key = ? AND user_id = users.id).
+        Index("ix_user_interests_interest_key_user_id", "interest_key", "user_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("users.id"), index=True)
@@ -86,29 +112,60 @@ class Swipe(Base):
     user_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("users.id"), index=True)
     target_user_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("users.id"), index=True)
     direction: Mapped[SwipeDirection] = mapped_column(Enum(SwipeDirection))
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(Timestamp, default=utcnow, server_default=func.now())
+
+
+class FeedQueueItem(Base):
+    """
+    Precomputed, ranked backlog of feed candidates per viewer (see app/services/feed_queue.py).
+    Rows are appended in ranked order by the refill worker and deleted when the viewer swipes.
+    """
+
+    __tablename__ = "feed_queue"
+    __table_args__ = (Index("ix_feed_queue_user_id_position", "user_id", "position"),)
+
+    user_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    candidate_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    position: Mapped[int] = mapped_column(Integer)
+    enqueued_at: Mapped[datetime] = mapped_column(Timestamp, default=utcnow, server_default=func.now())
 
 
 class Chat(Base):
     __tablename__ = "chats"
-    __table_args__ = (UniqueConstraint("user_a_id", "user_b_id", name="uq_chat_pair"),)
+    __table_args__ = (
+        UniqueConstraint("user_a_id", "user_b_id", name="uq_chat_pair"),
+        # Inbox: one index range scan per side of the pair (see chat_inbox.inbox_query).
+        Index("ix_chats_user_a_id_activity_at_id", "user_a_id", "activity_at", "id"),
+        Index("ix_chats_user_b_id_activity_at_id", "user_b_id", "activity_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_a_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("users.id"), index=True)
     user_b_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("users.id"), index=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(Timestamp, default=utcnow, server_default=func.now())
+
+    # Denormalized inbox summary, maintained by send_message (see app/services/chat_inbox.py).
+    # No FK on last_message_id: messages already reference chats, a second FK would be a cycle.
+    last_message_id: Mapped[uuid.UUID | None] = mapped_column(Uuid(as_uuid=True), nullable=True)
+    last_message_at: Mapped[datetime | None] = mapped_column(Timestamp, nullable=True)
+    unread_a_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    unread_b_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Inbox sort key: the match time, then the time of each new message.
+    activity_at: Mapped[datetime] = mapped_column(Timestamp, default=utcnow, server_default=func.now())
 
     messages: Mapped[list["Message"]] = relationship(back_populates="chat", cascade="all, delete-orphan")
 
 
 class Message(Base):
     __tablename__ = "messages"
+    # History pages and incremental sync: WHERE chat_id = ? ORDER BY created_at, id.
+    __table_args__ = (Index("ix_messages_chat_id_created_at_id", "chat_id", "created_at", "id"),)
 
     id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     chat_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("chats.id"), index=True)
     sender_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("users.id"), index=True)
     text: Mapped[str] = mapped_column(Text)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(Timestamp, default=utcnow, server_default=func.now())
 
     chat: Mapped[Chat] = relationship(back_populates="messages")
 
@@ -120,6 +177,6 @@ class SupportMessage(Base):
     user_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("users.id"), index=True)
     role: Mapped[str] = mapped_column(String(16))  # "user" | "assistant"
     text: Mapped[str] = mapped_column(Text)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(Timestamp, default=utcnow, server_default=func.now())
 
 
@@ -1,17 +1,66 @@
 from __future__ import annotations
 
 from sqlalchemy import create_engine
-from sqlalchemy.engine.url import make_url
+from sqlalchemy.engine.url import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.core import metrics
 from app.core.config import settings
+from app.db.instrumentation import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    install_pre_ping_interval,
+    install_query_counter,
+)
 
 url = make_url(settings.database_url)
 connect_args = {}
 if url.drivername.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
 
-engine = create_engine(settings.database_url, pool_pre_ping=True, connect_args=connect_args)
+
+def _async_url(sync_url: URL) -> URL:
+    # Same database through an asyncio driver: aiosqlite for SQLite, psycopg (v3, async mode) for Postgres.
+    if sync_url.get_backend_name() == "sqlite":
+        return sync_url.set(drivername="sqlite+aiosqlite")
+    if sync_url.get_backend_name() == "postgresql":
+        return sync_url.set(drivername="postgresql+psycopg")
+    return sync_url
+
+
+def _engine_kwargs(pool_class) -> dict:
+    kwargs: dict = {"pool_pre_ping": settings.db_pre_ping and settings.db_pre_ping_interval_s <= 0}
+    if url.get_backend_name() != "sqlite":
+        kwargs.update(
+            poolclass=pool_class,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_s,
+            pool_recycle=settings.db_pool_recycle_s,
+        )
+    return kwargs
+
+
+engine = create_engine(settings.database_url, connect_args=connect_args, **_engine_kwargs(InstrumentedQueuePool))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(_async_url(url), **_engine_kwargs(InstrumentedAsyncQueuePool))
+# expire_on_commit=False: attribute access after commit would need IO, which async sessions forbid.
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+for _engine in (engine, async_engine.sync_engine):
+    install_query_counter(_engine)
+    if settings.db_pre_ping and settings.db_pre_ping_interval_s > 0:
+        install_pre_ping_interval(_engine, settings.db_pre_ping_interval_s)
+
+
+def _pool_metrics() -> dict:
+    out = {}
+    for name, eng in (("sync", engine), ("async", async_engine.sync_engine)):
+        stats = getattr(eng.pool, "stats", None)
+        out[name] = stats.snapshot(eng.pool) if stats is not None else {"status": eng.pool.status()}
+    return out
+
 
+metrics.register("db_pool", _pool_metrics)
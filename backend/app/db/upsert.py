@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(db: Session, model):
+    """
+    INSERT construct of the session's dialect, which adds on_conflict_do_update/do_nothing.
+    Both supported databases (Postgres, SQLite >= 3.24) implement ON CONFLICT.
+    """
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        return postgresql.insert(model)
+    if name == "sqlite":
+        return sqlite.insert(model)
+    raise RuntimeError(f"Unsupported database dialect {name!r}: upserts need postgresql or sqlite")
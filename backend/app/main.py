@@ -1,21 +1,36 @@
 from __future__ import annotations
 
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 from app.api.routes.auth import router as auth_router
 from app.api.routes.chats import router as chats_router
 from app.api.routes.feed import router as feed_router
 from app.api.routes.me import router as me_router
+from app.api.routes.metrics import router as metrics_router
 from app.api.routes.support import router as support_router
+from app.api.routes.ws import router as ws_router
+from app.core import metrics
 from app.core.config import settings
+from app.core.security import password_hasher
+from app.db import instrumentation
 from app.db.init_db import create_tables, seed_interests
-from app.db.session import SessionLocal
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.services import auth_cache, chat_inbox, local_ranker, ranking_cache, support_answers
+from app.services.event_bus import create_event_bus
+from app.services.feed_queue import feed_refiller
+from app.services.gigachat_client import close_gigachat_session
+from app.services.image_variants import image_variants
+from app.services.reco_client import close_reco_client
+from app.services.realtime import hub
 from app.utils.default_assets import ensure_default_avatar
 from app.utils.images import ensure_dir
+from app.utils.media_files import MediaFiles
 
 app = FastAPI(title=settings.app_name)
+logger = logging.getLogger(__name__)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,8 +38,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+app.add_middleware(instrumentation.DbStatsMiddleware, exclude_prefixes=("/static/",))
+metrics.register("db_requests", instrumentation.route_stats.snapshot)
+
 
 @app.on_event("startup")
 def on_startup() -> None:
@@ -34,16 +53,77 @@ def on_startup() -> None:
     db = SessionLocal()
     try:
         seed_interests(db)
+        if chat_inbox.backfill_missing_summaries(db):
+            db.commit()
     finally:
         db.close()
 
 
-app.mount("/static", StaticFiles(directory=settings.upload_dir), name="static")
+@app.on_event("startup")
+async def start_realtime() -> None:
+    await hub.set_backend(create_event_bus(settings.database_url))
+    hub.add_listener(auth_cache.INVALIDATE_EVENT, auth_cache.handle_invalidate)
+    hub.add_listener(ranking_cache.INVALIDATE_EVENT, ranking_cache.handle_invalidate)
+    hub.add_listener(local_ranker.PROFILE_EVENT, local_ranker.handle_profile_event)
+    await hub.start()
+
+
+@app.on_event("shutdown")
+async def stop_realtime() -> None:
+    await hub.stop()
+
+
+@app.on_event("startup")
+async def warm_up_support_answers() -> None:
+    if not settings.support_cache_enabled:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.run_sync(support_answers.warm_up)
+    except Exception:
+        logger.exception("Support answer cache warm-up failed")
+
+
+@app.on_event("startup")
+async def start_local_ranker() -> None:
+    if settings.local_ranker_enabled:
+        await local_ranker.local_ranker.start()
+
+
+@app.on_event("shutdown")
+async def stop_local_ranker() -> None:
+    await local_ranker.local_ranker.stop()
+
+
+@app.on_event("startup")
+async def start_feed_refiller() -> None:
+    if settings.feed_queue_enabled:
+        await feed_refiller.start()
+
+
+@app.on_event("shutdown")
+async def stop_feed_refiller() -> None:
+    await feed_refiller.stop()
+
+
+@app.on_event("shutdown")
+async def close_clients() -> None:
+    await close_reco_client()
+    close_gigachat_session()
+    image_variants.close()
+    password_hasher.close()
+
+
+media_files = MediaFiles(directory=settings.upload_dir, accel_redirect_prefix=settings.media_accel_redirect_prefix)
+app.mount("/static", media_files, name="static")
+metrics.register("media", media_files.stats)
 
 app.include_router(auth_router)
 app.include_router(me_router)
 app.include_router(feed_router)
 app.include_router(chats_router)
 app.include_router(support_router)
+app.include_router(ws_router)
+app.include_router(metrics_router)
 
 
@@ -3,7 +3,9 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.schemas.profile import PhotoUrls
 
 
 class ChatListItem(BaseModel):
@@ -11,8 +13,10 @@ class ChatListItem(BaseModel):
     other_user_id: uuid.UUID
     other_name: str
     other_photo_url: str
+    other_photo_urls: PhotoUrls
     last_message: str | None
     last_message_at: datetime | None
+    unread_count: int = 0
 
 
 class MessageItem(BaseModel):
@@ -36,6 +40,16 @@ class SwipeResponse(BaseModel):
     created_chat_id: uuid.UUID | None = None
 
 
+class SwipeBatchRequest(BaseModel):
+    # In swipe order: for repeated targets the last direction wins, as with sequential calls.
+    items: list[SwipeRequest] = Field(min_length=1, max_length=200)
+
+
+class SwipeBatchResponse(BaseModel):
+    # One entry per request item, same order.
+    results: list[SwipeResponse]
+
+
 class AttachmentResponse(BaseModel):
     url: str
     name: str
@@ -7,5 +7,6 @@ from app.schemas.profile import ProfilePublic
 
 class FeedResponse(BaseModel):
     users: list[ProfilePublic]
+    next_cursor: str | None = None
 
 
@@ -20,13 +20,22 @@ INTERESTS_LIST = [
 Gender = Literal["male", "female", "other"]
 
 
+class PhotoUrls(BaseModel):
+    # Resized copies (128 / 512 / 1080 px longest side); the original while not rendered yet.
+    avatar: str
+    card: str
+    full: str
+
+
 class ProfilePublic(BaseModel):
     user_id: uuid.UUID
     name: str
     gender: Gender
     age: int
     about: str
+    # The stored upload at full size (metadata stripped on upload); photo_urls are resized copies.
     photo_url: str
+    photo_urls: PhotoUrls
     interests: list[str]
 
 
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import uuid
+from typing import Literal
+
+from pydantic import BaseModel
+
+from app.schemas.chat import MessageItem
+
+
+class MatchItem(BaseModel):
+    chat_id: uuid.UUID
+    user_ids: list[uuid.UUID]
+
+
+class RealtimeEvent(BaseModel):
+    type: Literal["message", "match"]
+    data: MessageItem | MatchItem
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from app.db.init_db import add_missing_columns
+from app.db.session import SessionLocal
+from app.services.chat_inbox import backfill_summaries
+
+
+def main() -> None:
+    # Columns are normally added on API startup; do it here too so the script works standalone.
+    add_missing_columns()
+
+    db = SessionLocal()
+    try:
+        backfill_summaries(db)
+        db.commit()
+        print("OK: chats.last_message_id / last_message_at / activity_at backfilled.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
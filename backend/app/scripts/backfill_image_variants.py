@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import as_completed
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.models import Profile
+from app.db.session import SessionLocal
+from app.services.image_variants import image_variants
+from app.utils.thumbnails import VARIANT_SIZES, variant_path
+
+
+def main() -> None:
+    db = SessionLocal()
+    try:
+        paths = set(db.scalars(select(Profile.photo_path)))
+    finally:
+        db.close()
+
+    # Photos uploaded before variants existed (or with a different IMAGE_VARIANT_FORMAT).
+    todo = [
+        p
+        for p in paths
+        if os.path.exists(p)
+        and not all(os.path.exists(variant_path(p, v, settings.image_variant_format)) for v in VARIANT_SIZES)
+    ]
+    futures = [f for f in map(image_variants.submit, todo) if f is not None]
+    failed = 0
+    for future in as_completed(futures):
+        if future.exception() is not None:
+            failed += 1
+    image_variants.close()
+    print(f"OK: {len(futures) - failed} photos rendered, {failed} failed, {len(paths) - len(todo)} skipped.")
+
+
+if __name__ == "__main__":
+    main()
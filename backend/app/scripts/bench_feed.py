@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert, not_, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db.models import Base, Gender, Profile, Swipe, SwipeDirection, User
+from app.services.feed_candidates import fetch_candidates
+
+
+def _legacy_feed(db: Session, viewer_id: uuid.UUID, limit: int) -> list[User]:
+    # The previous implementation: materialize swiped ids, send them back as NOT IN (...).
+    swiped_ids = {row[0] for row in db.execute(select(Swipe.target_user_id).where(Swipe.user_id == viewer_id))}
+    return (
+        db.query(User)
+        .join(Profile, Profile.user_id == User.id)
+        .filter(User.id != viewer_id, not_(User.id.in_(swiped_ids)))
+        .order_by(User.created_at.desc())
+        .limit(limit * 3)
+        .all()
+    )
+
+
+def _seed_users(db: Session, count: int) -> list[uuid.UUID]:
+    now = datetime.now(timezone.utc)
+    ids = [uuid.uuid4() for _ in range(count)]
+    db.execute(
+        insert(User),
+        [
+            {"id": uid, "login": f"bench{uid.hex}", "password_hash": "-", "created_at": now - timedelta(seconds=i)}
+            for i, uid in enumerate(ids)
+        ],
+    )
+    db.execute(
+        insert(Profile),
+        [
+            {
+                "user_id": uid,
+                "name": "Bench",
+                "gender": random.choice([Gender.male, Gender.female]),
+                "age": random.randint(18, 35),
+                "about": "",
+                "photo_path": "bench.jpg",
+            }
+            for uid in ids
+        ],
+    )
+    db.commit()
+    return ids
+
+
+def _time_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Feed candidate query latency vs. number of swipes by the viewer.")
+    p.add_argument("--database-url", type=str, default=None, help="Defaults to a throwaway SQLite file.")
+    p.add_argument("--swipes", type=str, default="0,1000,5000,20000", help="Comma-separated swipe counts.")
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--repeat", type=int, default=20)
+    args = p.parse_args()
+
+    steps = sorted(int(x) for x in args.swipes.split(",") if x.strip())
+    tmp_dir = None
+    url = args.database_url
+    if not url:
+        tmp_dir = tempfile.mkdtemp(prefix="bench_feed_")
+        url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        # Enough users that the feed never runs dry even after the largest swipe step.
+        ids = _seed_users(db, steps[-1] + args.limit * 10)
+        viewer_id, targets = ids[-1], ids[:-1]
+        random.shuffle(targets)
+
+        print(f"{'swipes':>8} {'new_ms':>10} {'legacy_ms':>10}")
+        swiped = 0
+        for step in steps:
+            batch = targets[swiped:step]
+            if batch:
+                db.execute(
+                    insert(Swipe),
+                    [
+                        {"id": uuid.uuid4(), "user_id": viewer_id, "target_user_id": t, "direction": SwipeDirection.left}
+                        for t in batch
+                    ],
+                )
+                db.commit()
+                swiped = step
+            new_ms = _time_ms(lambda: fetch_candidates(db, viewer_id, args.limit), args.repeat)
+            legacy_ms = _time_ms(lambda: _legacy_feed(db, viewer_id, args.limit), args.repeat)
+            db.expunge_all()
+            print(f"{step:>8} {new_ms:>10.2f} {legacy_ms:>10.2f}")
+    finally:
+        db.close()
+        engine.dispose()
+        if tmp_dir:
+            for name in os.listdir(tmp_dir):
+                os.remove(os.path.join(tmp_dir, name))
+            os.rmdir(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
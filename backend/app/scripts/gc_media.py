@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import argparse
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.media_store import collect_garbage
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Delete uploads no profile photo or chat message refers to.")
+    ap.add_argument(
+        "--delete",
+        action="store_true",
+        help="Actually delete. Without it, only reports what would be deleted.",
+    )
+    ap.add_argument(
+        "--min-age-hours",
+        type=float,
+        default=24,
+        help="Keep unreferenced files younger than this (attachments not yet sent, fresh uploads).",
+    )
+    args = ap.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = collect_garbage(db, settings.upload_dir, args.min_age_hours * 3600, dry_run=not args.delete)
+    finally:
+        db.close()
+
+    verb = "deleted" if args.delete else "would delete"
+    print(
+        f"OK: {report.files} files, {report.referenced} referenced ({report.shared} shared by several "
+        f"references), {report.kept_recent} unreferenced but recent; {verb} {report.deleted} "
+        f"({report.freed_bytes / 1024 / 1024:.1f} MiB)."
+    )
+
+
+if __name__ == "__main__":
+    main()
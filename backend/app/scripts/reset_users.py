@@ -4,8 +4,10 @@ import argparse
 
 from sqlalchemy.orm import Session
 
-from app.db.models import Chat, Message, Profile, SupportMessage, Swipe, User, UserInterest
+from app.db.models import Chat, FeedQueueItem, Message, Profile, SupportMessage, Swipe, User, UserInterest
 from app.db.session import SessionLocal
+from app.services import auth_cache
+from app.services.event_bus import publish_in_transaction
 
 
 def reset_users(db: Session) -> None:
@@ -18,9 +20,14 @@ def reset_users(db: Session) -> None:
     db.query(Message).delete()
     db.query(Chat).delete()
     db.query(Swipe).delete()
+    db.query(FeedQueueItem).delete()
     db.query(UserInterest).delete()
     db.query(Profile).delete()
     db.query(User).delete()
+    # Postgres: every API worker drops its cached sessions when this commits (NOTIFY).
+    # SQLite has no cross-process channel, so a running API keeps accepting the deleted users'
+    # tokens until its auth cache entries expire (AUTH_CACHE_TTL_S); accepted for a dev reset.
+    publish_in_transaction(db, [], auth_cache.invalidation_event())
     db.commit()
 
 
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import uuid
+from collections import Counter
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.models import Base, Chat, Gender, Profile, Swipe, SwipeDirection, User
+from app.services.swipes import apply_swipe
+
+
+async def _seed_pair(sessions: async_sessionmaker) -> tuple[uuid.UUID, uuid.UUID]:
+    ids = uuid.uuid4(), uuid.uuid4()
+    async with sessions() as db:
+        await db.execute(insert(User), [{"id": uid, "login": f"stress{uid.hex}", "password_hash": "-"} for uid in ids])
+        await db.execute(
+            insert(Profile),
+            [
+                {"user_id": uid, "name": "Stress", "gender": Gender.other, "age": 30, "about": "", "photo_path": "x.jpg"}
+                for uid in ids
+            ],
+        )
+        await db.commit()
+    return ids
+
+
+async def _swipe(sessions: async_sessionmaker, user_id: uuid.UUID, target_id: uuid.UUID, direction: SwipeDirection):
+    async with sessions() as db:
+        result = await db.run_sync(apply_swipe, user_id, target_id, direction)
+        await db.commit()
+        return result
+
+
+async def run(url: str, swipes: int) -> bool:
+    engine = create_async_engine(url, **({"connect_args": {"timeout": 30}} if url.startswith("sqlite") else {}))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+    try:
+        a, b = await _seed_pair(sessions)
+        # Both users hammer the same pair, mostly right swipes with some left ones mixed in.
+        jobs = [
+            _swipe(
+                sessions,
+                *((a, b) if i % 2 == 0 else (b, a)),
+                SwipeDirection.left if i % 7 == 0 else SwipeDirection.right,
+            )
+            for i in range(swipes)
+        ]
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+
+        errors = Counter(type(r).__name__ for r in results if isinstance(r, BaseException))
+        ok = [r for r in results if not isinstance(r, BaseException)]
+        async with sessions() as db:
+            swipe_rows = await db.scalar(
+                select(func.count()).select_from(Swipe).where(Swipe.user_id.in_([a, b]))
+            )
+            chats = list(await db.scalars(select(Chat.id).where(Chat.user_a_id.in_([a, b]))))
+        chat_ids = {r.chat_id for r in ok if r.chat_id is not None}
+        new_matches = sum(r.new_match for r in ok)
+
+        print(f"swipes={swipes} ok={len(ok)} errors={dict(errors) or 0}")
+        print(f"swipe rows={swipe_rows} chats={len(chats)} distinct returned chat ids={len(chat_ids)} new matches={new_matches}")
+        passed = not errors and swipe_rows == 2 and len(chats) == 1 and chat_ids == set(chats) and new_matches == 1
+        print("PASS" if passed else "FAIL")
+        return passed
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Fire many simultaneous swipes on one pair; expect no errors, one chat.")
+    p.add_argument(
+        "--database-url",
+        type=str,
+        default=None,
+        help="Async URL (postgresql+psycopg://..., sqlite+aiosqlite://...). Defaults to a throwaway SQLite file.",
+    )
+    p.add_argument("--swipes", type=int, default=200)
+    args = p.parse_args()
+
+    tmp_dir = None
+    url = args.database_url
+    if not url:
+        tmp_dir = tempfile.mkdtemp(prefix="stress_swipes_")
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp_dir, 'stress.db')}"
+    elif make_url(url).drivername == "postgresql":
+        url = make_url(url).set(drivername="postgresql+psycopg").render_as_string(hide_password=False)
+    try:
+        passed = asyncio.run(run(url, args.swipes))
+    finally:
+        if tmp_dir:
+            for name in os.listdir(tmp_dir):
+                os.remove(os.path.join(tmp_dir, name))
+            os.rmdir(tmp_dir)
+    raise SystemExit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.session import make_transient_to_detached
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.models import User
+from app.utils.ttl_cache import TTLCache
+
+INVALIDATE_EVENT = "auth.invalidate"
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    id: uuid.UUID
+    login: str
+    password_hash: str
+    is_active: bool
+    created_at: datetime
+
+    @classmethod
+    def of(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            login=user.login,
+            password_hash=user.password_hash,
+            is_active=user.is_active,
+            created_at=user.created_at,
+        )
+
+    def attach(self, db: Session) -> User:
+        """
+        A User bound to `db` without a SELECT; relationships (profile, ...) still lazy-load.
+        """
+        user = User(
+            id=self.id,
+            login=self.login,
+            password_hash=self.password_hash,
+            is_active=self.is_active,
+            created_at=self.created_at,
+        )
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+
+# token -> user id, valid until min(TTL, token exp)
+tokens: TTLCache[str, uuid.UUID] = TTLCache(settings.auth_cache_size, settings.auth_cache_ttl_s)
+# user id -> snapshot of an active user
+users: TTLCache[uuid.UUID, UserSnapshot] = TTLCache(settings.auth_cache_size, settings.auth_cache_ttl_s)
+
+
+def remember_token(token: str, user_id: uuid.UUID, exp: float | None) -> None:
+    ttl = None if exp is None else exp - time.time()
+    tokens.set(token, user_id, ttl)
+
+
+def invalidate_user(user_id: uuid.UUID) -> None:
+    users.pop(user_id)
+
+
+def clear() -> None:
+    tokens.clear()
+    users.clear()
+
+
+def handle_invalidate(event: dict) -> None:
+    """
+    Hub listener for INVALIDATE_EVENT, so deactivations/resets done by another worker or by a
+    script reach this worker's cache before the TTL runs out.
+    """
+    data = event.get("data") or {}
+    if data.get("all"):
+        clear()
+        return
+    for raw in data.get("user_ids") or []:
+        invalidate_user(uuid.UUID(raw))
+
+
+def invalidation_event(user_ids: list[uuid.UUID] | None = None) -> dict:
+    if user_ids is None:
+        return {"type": INVALIDATE_EVENT, "data": {"all": True}}
+    return {"type": INVALIDATE_EVENT, "data": {"user_ids": [str(x) for x in user_ids]}}
+
+
+metrics.register("auth_cache", lambda: {"tokens": tokens.stats(), "users": users.stats()})
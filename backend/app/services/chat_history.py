@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import Message
+from app.utils.cursor import keyset_after, keyset_before
+
+
+def fetch_messages(
+    db: Session,
+    chat_id: uuid.UUID,
+    limit: int,
+    before: tuple[datetime, uuid.UUID] | None = None,
+    after: tuple[datetime, uuid.UUID] | None = None,
+    since: datetime | None = None,
+) -> list[Message]:
+    """
+    One page of chat history, oldest first: the latest `limit` messages, those right before the
+    `before` cursor, or the first ones after the `after`/`since` position.
+    """
+    stmt = select(Message).where(Message.chat_id == chat_id)
+    if after is not None or since is not None:
+        if after is not None:
+            stmt = stmt.where(keyset_after(Message.created_at, Message.id, after))
+        if since is not None:
+            # Compare in UTC, the zone creation times are stored in (SQLite drops the offset);
+            # a naive `since` is taken as UTC.
+            since = since.astimezone(timezone.utc) if since.tzinfo else since.replace(tzinfo=timezone.utc)
+            stmt = stmt.where(Message.created_at >= since)
+        stmt = stmt.order_by(Message.created_at.asc(), Message.id.asc()).limit(limit)
+        return list(db.scalars(stmt))
+
+    if before is not None:
+        stmt = stmt.where(keyset_before(Message.created_at, Message.id, before))
+    stmt = stmt.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+    return list(reversed(db.scalars(stmt).all()))
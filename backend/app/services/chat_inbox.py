@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Row, Select, func, select, union_all, update
+from sqlalchemy.orm import Session
+
+from app.db.models import Chat, Message, Profile
+from app.utils.cursor import encode_cursor, keyset_before
+
+
+def _inbox_side(
+    viewer_col,
+    other_col,
+    unread_col,
+    viewer_id: uuid.UUID,
+    limit: int,
+    after: tuple[datetime, uuid.UUID] | None,
+) -> Select:
+    # The viewer's chats on one side of the pair: a range scan on (viewer_col, activity_at, id).
+    stmt = (
+        select(
+            Chat.id.label("chat_id"),
+            other_col.label("other_user_id"),
+            unread_col.label("unread_count"),
+            Chat.last_message_id,
+            Chat.last_message_at,
+            Chat.activity_at,
+        )
+        .where(viewer_col == viewer_id)
+        .order_by(Chat.activity_at.desc(), Chat.id.desc())
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.where(keyset_before(Chat.activity_at, Chat.id, after))
+    # Wrapped so ORDER BY / LIMIT stay inside the UNION member on every dialect.
+    return select(stmt.subquery())
+
+
+def inbox_query(viewer_id: uuid.UUID, limit: int, after: tuple[datetime, uuid.UUID] | None = None) -> Select:
+    """
+    One statement for an inbox page: chat, the other user's profile and the last message, newest
+    activity first, keyset-paginated on (activity_at, chat id). One UNION ALL branch per side of
+    the pair, each on its own (user_x_id, activity_at, id) index.
+    """
+    sides = union_all(
+        _inbox_side(Chat.user_a_id, Chat.user_b_id, Chat.unread_a_count, viewer_id, limit, after),
+        _inbox_side(Chat.user_b_id, Chat.user_a_id, Chat.unread_b_count, viewer_id, limit, after),
+    ).subquery()
+
+    return (
+        select(
+            sides.c.chat_id,
+            Profile.user_id.label("other_user_id"),
+            Profile.name.label("other_name"),
+            Profile.photo_path.label("other_photo_path"),
+            Message.text.label("last_message"),
+            sides.c.last_message_at,
+            sides.c.unread_count,
+            sides.c.activity_at,
+        )
+        .join(Profile, Profile.user_id == sides.c.other_user_id)
+        .outerjoin(Message, Message.id == sides.c.last_message_id)
+        .order_by(sides.c.activity_at.desc(), sides.c.chat_id.desc())
+        .limit(limit)
+    )
+
+
+def fetch_inbox(
+    db: Session,
+    viewer_id: uuid.UUID,
+    limit: int,
+    after: tuple[datetime, uuid.UUID] | None = None,
+) -> tuple[list[Row], str | None]:
+    rows = list(db.execute(inbox_query(viewer_id, limit + 1, after)))
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(last.activity_at, last.chat_id)
+
+
+def record_message(db: Session, chat: Chat, message: Message) -> None:
+    """
+    Updates the chat summary for a just-flushed message, in the caller's transaction.
+    A single UPDATE: the recipient's unread counter is incremented in SQL, so concurrent
+    senders do not lose increments.
+    """
+    unread_col = Chat.unread_b_count if message.sender_id == chat.user_a_id else Chat.unread_a_count
+    sent_at = select(Message.created_at).where(Message.id == message.id).scalar_subquery()
+    db.execute(
+        update(Chat)
+        .where(Chat.id == chat.id)
+        .values(
+            {
+                Chat.last_message_id: message.id,
+                Chat.last_message_at: sent_at,
+                Chat.activity_at: sent_at,
+                unread_col: unread_col + 1,
+            }
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def mark_read(db: Session, chat: Chat, reader_id: uuid.UUID) -> None:
+    unread_col = Chat.unread_a_count if reader_id == chat.user_a_id else Chat.unread_b_count
+    db.execute(
+        update(Chat)
+        .where(Chat.id == chat.id)
+        .values({unread_col: 0})
+        .execution_options(synchronize_session=False)
+    )
+
+
+def backfill_summaries(db: Session) -> None:
+    """
+    Recomputes last_message_id/last_message_at/activity_at for every chat from `messages`.
+    Unread counters are left as is: there is no read state to derive them from.
+    """
+    last_id = (
+        select(Message.id)
+        .where(Message.chat_id == Chat.id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    db.execute(update(Chat).values(last_message_id=last_id).execution_options(synchronize_session=False))
+    last_at = select(Message.created_at).where(Message.id == Chat.last_message_id).scalar_subquery()
+    db.execute(update(Chat).values(last_message_at=last_at).execution_options(synchronize_session=False))
+    activity_at = func.coalesce(Chat.last_message_at, Chat.created_at)
+    db.execute(update(Chat).values(activity_at=activity_at).execution_options(synchronize_session=False))
+
+
+def backfill_missing_summaries(db: Session) -> bool:
+    """
+    Runs backfill_summaries when chats from before the summary columns existed (NULL
+    activity_at) are present; such chats would otherwise sort last in the inbox. True if it ran.
+    """
+    if db.execute(select(Chat.id).where(Chat.activity_at.is_(None)).limit(1)).first() is None:
+        return False
+    backfill_summaries(db)
+    return True
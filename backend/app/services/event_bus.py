@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.orm import Session
+
+from app.services.realtime import Deliver, Event, EventBackend, LocalBackend
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "twinby_events"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+MAX_PAYLOAD_BYTES = 7900
+
+
+class PostgresEventBus:
+    """
+    Cross-worker transport over Postgres LISTEN/NOTIFY: one listening and one notifying connection
+    per worker, outside the SQLAlchemy pool. A worker also receives its own notifications.
+    """
+
+    reconnect_delay_s = 1.0
+
+    def __init__(self, database_url: str) -> None:
+        url = make_url(database_url).set(drivername="postgresql")
+        self._conninfo = url.render_as_string(hide_password=False)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._deliver: Deliver | None = None
+        self._listener_task: asyncio.Task | None = None
+        self._publisher = None
+        self._publish_lock: asyncio.Lock | None = None
+
+    async def start(self, loop: asyncio.AbstractEventLoop, deliver: Deliver) -> None:
+        self._loop = loop
+        self._deliver = deliver
+        self._publish_lock = asyncio.Lock()
+        self._listener_task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self) -> None:
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+        if self._publisher is not None:
+            await self._publisher.close()
+            self._publisher = None
+        self._loop = None
+        self._deliver = None
+
+    def publish(self, user_ids: list[str], event: Event) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        payload = _encode(user_ids, event)
+        if len(payload.encode("utf-8")) > MAX_PAYLOAD_BYTES:
+            # Too big for NOTIFY: deliver to this worker only, other workers' clients resync via REST.
+            logger.warning("Event payload too large for NOTIFY, delivering locally only")
+            if self._deliver is not None:
+                loop.call_soon_threadsafe(self._deliver, user_ids, event)
+            return
+        asyncio.run_coroutine_threadsafe(self._notify(payload), loop)
+
+    async def _notify(self, payload: str) -> None:
+        import psycopg
+
+        async with self._publish_lock:
+            try:
+                if self._publisher is None or self._publisher.closed:
+                    self._publisher = await psycopg.AsyncConnection.connect(self._conninfo, autocommit=True)
+                await self._publisher.execute("SELECT pg_notify(%s, %s)", (CHANNEL, payload))
+            except Exception:
+                logger.exception("NOTIFY failed")
+                if self._publisher is not None:
+                    await self._publisher.close()
+                    self._publisher = None
+
+    async def _listen_forever(self) -> None:
+        import psycopg
+
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self._conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    async for notify in conn.notifies():
+                        self._dispatch(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Event bus listener failed, reconnecting")
+            await asyncio.sleep(self.reconnect_delay_s)
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+            user_ids, event = data["u"], data["e"]
+        except Exception:
+            logger.warning("Malformed event bus payload")
+            return
+        if self._deliver is not None:
+            self._deliver(user_ids, event)
+
+
+def _encode(user_ids: list[str], event: Event) -> str:
+    return json.dumps({"u": user_ids, "e": event}, separators=(",", ":"))
+
+
+def publish_in_transaction(db: Session, user_ids: list[str], event: Event) -> None:
+    """
+    NOTIFY from a plain DB session (scripts, code outside the API process). Postgres delivers it to
+    every listening worker when `db` commits. No-op on other databases, where there is a single
+    process and nobody else to tell.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": _encode(user_ids, event)})
+
+
+def create_event_bus(database_url: str) -> EventBackend:
+    """
+    LISTEN/NOTIFY for Postgres; in-memory loopback otherwise (SQLite dev mode, one worker).
+    """
+    if make_url(database_url).get_backend_name() == "postgresql":
+        return PostgresEventBus(database_url)
+    return LocalBackend()
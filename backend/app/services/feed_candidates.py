@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import Select, exists, select
+from sqlalchemy.orm import Session
+
+from app.db.models import Gender, Profile, Swipe, User, UserInterest
+from app.utils.cursor import encode_cursor, keyset_before
+
+
+@dataclass(frozen=True)
+class FeedFilters:
+    min_age: int | None = None
+    max_age: int | None = None
+    genders: tuple[Gender, ...] = ()
+    # Candidate must have every one of these interests...
+    interests_all: tuple[str, ...] = ()
+    # ...and at least one of these.
+    interests_any: tuple[str, ...] = ()
+
+    def __bool__(self) -> bool:
+        return any(
+            (self.min_age is not None, self.max_age is not None, self.genders, self.interests_all, self.interests_any)
+        )
+
+
+def _has_interest(*keys: str):
+    stmt = select(UserInterest.id).where(UserInterest.user_id == User.id).correlate(User)
+    if len(keys) == 1:
+        return exists(stmt.where(UserInterest.interest_key == keys[0]))
+    return exists(stmt.where(UserInterest.interest_key.in_(keys)))
+
+
+def candidate_query(
+    viewer_id: uuid.UUID,
+    after: tuple[datetime, uuid.UUID] | None = None,
+    filters: FeedFilters | None = None,
+) -> Select:
+    """
+    Users the viewer has not swiped yet (NOT EXISTS against `swipes`), newest first, narrowed by
+    `filters`, keyset-paginated on (created_at, id).
+    """
+    already_swiped = (
+        select(Swipe.id)
+        .where(Swipe.user_id == viewer_id, Swipe.target_user_id == User.id)
+        .correlate(User)
+    )
+    stmt = (
+        select(User)
+        .join(Profile, Profile.user_id == User.id)
+        .where(User.id != viewer_id, ~exists(already_swiped))
+        .order_by(User.created_at.desc(), User.id.desc())
+    )
+    if after is not None:
+        stmt = stmt.where(keyset_before(User.created_at, User.id, after))
+    if filters:
+        # Filtering here rather than after the fetch keeps pages full and the ranker's input
+        # eligible. Interests are EXISTS probes on ix_user_interests_interest_key_user_id.
+        if filters.genders:
+            stmt = stmt.where(Profile.gender.in_(filters.genders))
+        if filters.min_age is not None:
+            stmt = stmt.where(Profile.age >= filters.min_age)
+        if filters.max_age is not None:
+            stmt = stmt.where(Profile.age <= filters.max_age)
+        for key in filters.interests_all:
+            stmt = stmt.where(_has_interest(key))
+        if filters.interests_any:
+            stmt = stmt.where(_has_interest(*filters.interests_any))
+    return stmt
+
+
+def fetch_candidates(
+    db: Session,
+    viewer_id: uuid.UUID,
+    limit: int,
+    after: tuple[datetime, uuid.UUID] | None = None,
+    filters: FeedFilters | None = None,
+) -> tuple[list[User], str | None]:
+    """
+    Returns one page of candidates and the cursor for the next page (None on the last page).
+    """
+    rows = list(db.scalars(candidate_query(viewer_id, after, filters).limit(limit + 1)))
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(last.created_at, last.id)
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+
+from sqlalchemy import delete, exists, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.models import FeedQueueItem, Swipe, User
+from app.db.session import AsyncSessionLocal
+from app.services.feed_candidates import candidate_query
+from app.services.feed_ranking import rank_for_user
+from app.utils.cursor import encode_position_cursor
+
+logger = logging.getLogger(__name__)
+
+
+def _not_swiped(user_id: uuid.UUID):
+    swiped = (
+        select(Swipe.id)
+        .where(Swipe.user_id == user_id, Swipe.target_user_id == FeedQueueItem.candidate_id)
+        .correlate(FeedQueueItem)
+    )
+    return ~exists(swiped)
+
+
+def read_queue(
+    db: Session,
+    user_id: uuid.UUID,
+    limit: int,
+    after_position: int | None = None,
+) -> tuple[list[uuid.UUID], str | None, int]:
+    """
+    One page of the viewer's queue in ranked order, the cursor for the next page, and the current
+    queue depth. Entries swiped through another path (another worker, a retried request) are
+    skipped here rather than trusted to have been popped.
+    """
+    stmt = (
+        select(FeedQueueItem.candidate_id, FeedQueueItem.position)
+        .where(FeedQueueItem.user_id == user_id, _not_swiped(user_id))
+        .order_by(FeedQueueItem.position, FeedQueueItem.candidate_id)
+    )
+    if after_position is not None:
+        stmt = stmt.where(FeedQueueItem.position > after_position)
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    depth = queue_depth(db, user_id)
+
+    page = rows[:limit]
+    next_cursor = encode_position_cursor(page[-1].position) if len(rows) > limit else None
+    return [r.candidate_id for r in page], next_cursor, depth
+
+
+def pop(db: Session, user_id: uuid.UUID, candidate_ids: list[uuid.UUID]) -> None:
+    """
+    Removes swiped candidates from the viewer's queue (part of the caller's transaction).
+    """
+    if candidate_ids:
+        db.execute(
+            delete(FeedQueueItem).where(FeedQueueItem.user_id == user_id, FeedQueueItem.candidate_id.in_(candidate_ids))
+        )
+
+
+def queue_depth(db: Session, user_id: uuid.UUID) -> int:
+    """
+    Queued candidates the viewer has not swiped yet (what read_queue can still serve).
+    """
+    stmt = (
+        select(func.count())
+        .select_from(FeedQueueItem)
+        .where(FeedQueueItem.user_id == user_id, _not_swiped(user_id))
+    )
+    return db.scalar(stmt) or 0
+
+
+def clear(db: Session, user_id: uuid.UUID) -> None:
+    """
+    Drops the viewer's whole queue (part of the caller's transaction); the next feed read
+    finds it empty and requests a refill.
+    """
+    db.execute(delete(FeedQueueItem).where(FeedQueueItem.user_id == user_id))
+
+
+def refill_batch(db: Session, user_id: uuid.UUID, size: int) -> list[uuid.UUID]:
+    """
+    Up to `size` unswiped candidates that are not queued yet, newest first.
+    """
+    queued = (
+        select(FeedQueueItem.candidate_id)
+        .where(FeedQueueItem.user_id == user_id, FeedQueueItem.candidate_id == User.id)
+        .correlate(User)
+    )
+    stmt = candidate_query(user_id).where(~exists(queued)).limit(size)
+    return [u.id for u in db.scalars(stmt)]
+
+
+def append(db: Session, user_id: uuid.UUID, ranked_ids: list[uuid.UUID]) -> None:
+    """
+    Appends `ranked_ids` after the current tail, keeping their order.
+    """
+    if not ranked_ids:
+        return
+    tail = db.scalar(select(func.max(FeedQueueItem.position)).where(FeedQueueItem.user_id == user_id)) or 0
+    db.execute(
+        insert(FeedQueueItem),
+        [
+            {"user_id": user_id, "candidate_id": candidate_id, "position": tail + i}
+            for i, candidate_id in enumerate(ranked_ids, start=1)
+        ],
+    )
+
+
+class FeedRefiller:
+    """
+    Background worker that tops up feed queues off the request path, one refill per user at a time.
+    """
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue[uuid.UUID] | None = None
+        self._pending: set[uuid.UUID] = set()
+        self._task: asyncio.Task | None = None
+        self.counters = {"requested": 0, "refills": 0, "enqueued": 0, "conflicts": 0, "errors": 0}
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._queue = None
+        self._pending.clear()
+
+    def request(self, user_id: uuid.UUID) -> None:
+        """
+        Schedules a refill for `user_id`; no-op if one is already pending or the worker is stopped.
+        Must be called on the event loop.
+        """
+        if self._queue is None or user_id in self._pending:
+            return
+        self._pending.add(user_id)
+        self.counters["requested"] += 1
+        self._queue.put_nowait(user_id)
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        while True:
+            user_id = await self._queue.get()
+            try:
+                await self.refill(user_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.counters["errors"] += 1
+                logger.exception("Feed queue refill failed for %s", user_id)
+            finally:
+                self._pending.discard(user_id)
+
+    async def refill(self, user_id: uuid.UUID) -> int:
+        """
+        Tops the queue of `user_id` up to settings.feed_queue_size; returns the number of rows added.
+        """
+        async with AsyncSessionLocal() as db:
+            need = settings.feed_queue_size - await db.run_sync(queue_depth, user_id)
+            if need <= 0:
+                return 0
+            candidate_ids = await db.run_sync(refill_batch, user_id, need)
+        if not candidate_ids:
+            return 0
+        # No connection is held while the ranker works.
+        ranked = await rank_for_user(user_id, candidate_ids)
+        async with AsyncSessionLocal() as db:
+            try:
+                await db.run_sync(append, user_id, ranked)
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                self.counters["conflicts"] += 1
+                return 0
+        self.counters["refills"] += 1
+        self.counters["enqueued"] += len(ranked)
+        return len(ranked)
+
+    def stats(self) -> dict:
+        return {**self.counters, "pending": len(self._pending)}
+
+
+feed_refiller = FeedRefiller()
+
+metrics.register("feed_queue", feed_refiller.stats)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+
+from app.core.config import settings
+from app.services.local_ranker import local_ranker
+from app.services.ranking_cache import ranking_cache
+from app.services.reco_client import RecoUnavailableError, get_reco_client
+
+logger = logging.getLogger(__name__)
+
+
+def _fallback(user_id: uuid.UUID, candidate_ids: list[uuid.UUID]) -> list[uuid.UUID]:
+    if settings.local_ranker_enabled:
+        return local_ranker.rank(user_id, candidate_ids)
+    return candidate_ids
+
+
+async def rank_for_user(user_id: uuid.UUID, candidate_ids: list[uuid.UUID]) -> list[uuid.UUID]:
+    """
+    Candidate ids in the order the reco service ranks them for `user_id`. Never raises: without a
+    configured or healthy service the in-process ranker orders them (or, if that is disabled,
+    the input recency order is kept).
+    """
+    if not candidate_ids:
+        return candidate_ids
+    reco = get_reco_client()
+    if reco is None:
+        return _fallback(user_id, candidate_ids)
+    cached = ranking_cache.get(user_id, candidate_ids)
+    if cached is not None:
+        return cached
+    t0 = time.perf_counter()
+    try:
+        ranked = await reco.rank_candidates(user_id, candidate_ids)
+    except RecoUnavailableError:
+        return _fallback(user_id, candidate_ids)  # breaker open: counted in reco metrics
+    except Exception as e:
+        logger.warning("Reco ranking failed, falling back to the local ranker: %s: %s", type(e).__name__, e)
+        return _fallback(user_id, candidate_ids)
+    known = set(candidate_ids)
+    ranked = [i for i in ranked if i in known]
+    ranking_cache.set(user_id, ranked, (time.perf_counter() - t0) * 1000)
+    return ranked
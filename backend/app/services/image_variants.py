@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import Request
+
+from app.core import metrics
+from app.core.config import settings
+from app.schemas.profile import PhotoUrls
+from app.utils.thumbnails import VARIANT_SIZES, render_variants, variant_path
+from app.utils.ttl_cache import TTLCache
+from app.utils.urls import static_url
+
+logger = logging.getLogger(__name__)
+
+# Rendered variant paths remembered per worker (they never change; the bound only caps memory).
+READY_CACHE_SIZE = 100_000
+READY_CACHE_TTL_S = 24 * 3600
+
+
+class ImageVariants:
+    """
+    Renders resized copies of uploaded photos (see thumbnails.render_variants) in a process pool,
+    off the request path. Until they exist, URLs point at the stored upload.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+        self._ready: TTLCache[str, bool] = TTLCache(READY_CACHE_SIZE, READY_CACHE_TTL_S)
+        self.counters = {"submitted": 0, "rendered": 0, "failed": 0}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs an event loop and DB pools is not safe.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=settings.image_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def submit(self, path: str) -> Future | None:
+        """
+        Schedules variant rendering for a freshly stored upload; safe to call from any thread. Never
+        raises. None when nothing was scheduled.
+        """
+        if not settings.image_variants_enabled:
+            return None
+        fmt = settings.image_variant_format
+        if all(os.path.exists(variant_path(path, v, fmt)) for v in VARIANT_SIZES):
+            return None  # same content uploaded before
+        error: Exception | None = None
+        for _ in range(2):
+            pool = self._executor()
+            try:
+                future = pool.submit(render_variants, path, fmt, settings.image_variant_quality)
+            except BrokenProcessPool as exc:
+                # Broke since the last render finished: retry once on a fresh pool.
+                self._discard(pool)
+                error = exc
+                continue
+            except RuntimeError as exc:
+                # Shut down (close() at app shutdown) between _executor() and submit().
+                error = exc
+                break
+            self.counters["submitted"] += 1
+            future.add_done_callback(lambda f: self._finished(pool, f))
+            return future
+        self.counters["failed"] += 1
+        logger.warning("Image variant rendering not scheduled for %s: %s", path, error)
+        return None
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        # A killed worker breaks the whole pool for good; the next submit starts a new one.
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+
+    def _finished(self, pool: ProcessPoolExecutor, future: Future) -> None:
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if isinstance(exc, BrokenProcessPool):
+            self._discard(pool)
+        if exc is not None:
+            self.counters["failed"] += 1
+            logger.warning("Image variant rendering failed: %s", exc)
+            return
+        self.counters["rendered"] += 1
+        for out in future.result():
+            self._ready.set(out, True)
+
+    def path(self, path: str, variant: str) -> str:
+        """
+        The `variant` file for the upload at `path` if it has been rendered, else `path` itself.
+        """
+        if not settings.image_variants_enabled:
+            return path
+        out = variant_path(path, variant, settings.image_variant_format)
+        if self._ready.get(out):
+            return out
+        if os.path.exists(out):
+            self._ready.set(out, True)
+            return out
+        return path
+
+    def urls(self, request: Request, path: str) -> PhotoUrls:
+        return PhotoUrls(**{variant: static_url(request, self.path(path, variant)) for variant in VARIANT_SIZES})
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {**self.counters, "pool_started": self._pool is not None, "ready_cache": self._ready.stats()}
+
+
+image_variants = ImageVariants()
+
+metrics.register("image_variants", image_variants.stats)
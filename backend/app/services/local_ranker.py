@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.models import Profile, User, UserInterest, epoch_seconds
+from app.db.session import AsyncSessionLocal
+from app.schemas.profile import INTERESTS_LIST
+
+logger = logging.getLogger(__name__)
+
+PROFILE_EVENT = "ranker.profile"
+
+# Score = weighted sum of three terms in [0, 1].
+INTEREST_WEIGHT = 0.5
+AGE_WEIGHT = 0.3
+RECENCY_WEIGHT = 0.2
+# Age gap at which the age term drops to 1/e.
+AGE_SCALE_YEARS = 5.0
+# Account age at which the recency term halves.
+RECENCY_HALF_LIFE_S = 14 * 24 * 3600
+
+RANK_BUCKETS_US = (10, 50, 100, 500, 1000, 5000, 10000)
+
+_BITS = {key: 1 << i for i, key in enumerate(INTERESTS_LIST)}
+
+
+def interest_mask(keys: list[str]) -> int:
+    """
+    One bit per INTERESTS_LIST key; unknown keys are ignored.
+    """
+    mask = 0
+    for key in keys:
+        mask |= _BITS.get(key, 0)
+    return mask
+
+
+class ProfileIndex:
+    """
+    Column arrays (interest bitmask, age, signup time) for every active profile, one row per
+    user, plus a user id -> row map. Rows are updated in place; the arrays double when full.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._lock = threading.Lock()
+        self._row: dict[uuid.UUID, int] = {}
+        self._size = 0
+        self.masks = np.zeros(capacity, dtype=np.uint32)
+        self.ages = np.zeros(capacity, dtype=np.int16)
+        self.created = np.zeros(capacity, dtype=np.float64)
+        # Newest users.created_at seen by a load; the periodic sync only reads users after it.
+        self.watermark: datetime | None = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def upsert(self, user_id: uuid.UUID, age: int, interests: list[str], created_at: datetime) -> None:
+        with self._lock:
+            row = self._row.get(user_id)
+            if row is None:
+                if self._size == len(self.masks):
+                    self._grow()
+                row = self._size
+                self._row[user_id] = row
+                self._size += 1
+            self.masks[row] = interest_mask(interests)
+            self.ages[row] = age
+            self.created[row] = epoch_seconds(created_at)
+
+    def _grow(self) -> None:
+        capacity = len(self.masks) * 2
+        for name in ("masks", "ages", "created"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def rank(self, viewer_id: uuid.UUID, candidate_ids: list[uuid.UUID]) -> list[uuid.UUID]:
+        """
+        Candidates by descending score; ties and candidates missing from the index keep their
+        input (recency) order, the latter after all indexed ones.
+        """
+        with self._lock:
+            rows = np.fromiter((self._row.get(x, -1) for x in candidate_ids), dtype=np.int64, count=len(candidate_ids))
+            known = rows >= 0
+            idx = rows[known]
+            masks, ages, created = self.masks[idx], self.ages[idx], self.created[idx]
+            viewer_row = self._row.get(viewer_id)
+            viewer = None if viewer_row is None else (int(self.masks[viewer_row]), int(self.ages[viewer_row]))
+
+        score = RECENCY_WEIGHT * np.exp2(-(time.time() - created) / RECENCY_HALF_LIFE_S)
+        if viewer is not None:
+            viewer_mask, viewer_age = viewer
+            union = np.bitwise_count(masks | np.uint32(viewer_mask))
+            common = np.bitwise_count(masks & np.uint32(viewer_mask))
+            score += INTEREST_WEIGHT * np.divide(common, union, out=np.zeros(len(idx)), where=union > 0)
+            score += AGE_WEIGHT * np.exp(-np.abs(ages.astype(np.float64) - viewer_age) / AGE_SCALE_YEARS)
+
+        order = np.argsort(-score, kind="stable")
+        positions = np.flatnonzero(known)[order]
+        ranked = [candidate_ids[i] for i in positions]
+        ranked.extend(x for x, ok in zip(candidate_ids, known) if not ok)
+        return ranked
+
+
+def load_profiles(
+    db: Session, created_since: datetime | None = None
+) -> list[tuple[uuid.UUID, int, datetime, list[str]]]:
+    """
+    (user id, age, created_at, interest keys) of active users with a profile, optionally only
+    those created at or after `created_since`.
+    """
+    users = select(User.id).where(User.is_active.is_(True))
+    if created_since is not None:
+        users = users.where(User.created_at >= created_since)
+    rows = db.execute(
+        select(User.id, Profile.age, User.created_at)
+        .join(Profile, Profile.user_id == User.id)
+        .where(User.id.in_(users))
+    ).all()
+    interests: dict[uuid.UUID, list[str]] = {}
+    for user_id, key in db.execute(
+        select(UserInterest.user_id, UserInterest.interest_key).where(UserInterest.user_id.in_(users))
+    ):
+        interests.setdefault(user_id, []).append(key)
+    return [(user_id, age, created_at, interests.get(user_id, [])) for user_id, age, created_at in rows]
+
+
+class LocalRanker:
+    """
+    In-process fallback ranker: vectorized NumPy scoring over the ProfileIndex, no network hop.
+    """
+
+    def __init__(self) -> None:
+        self.index = ProfileIndex()
+        self.rank_us = metrics.Histogram(RANK_BUCKETS_US)
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync_forever())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def sync(self) -> int:
+        async with AsyncSessionLocal() as db:
+            rows = await db.run_sync(load_profiles, self.index.watermark)
+        for user_id, age, created_at, keys in rows:
+            self.index.upsert(user_id, age, keys, created_at)
+        if rows:
+            # Inclusive bound: users sharing the newest timestamp are read again, which is harmless.
+            self.index.watermark = max(created_at for _, _, created_at, _ in rows)
+        return len(rows)
+
+    async def _sync_forever(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Local ranker index sync failed")
+            await asyncio.sleep(settings.local_ranker_sync_s)
+
+    def rank(self, viewer_id: uuid.UUID, candidate_ids: list[uuid.UUID]) -> list[uuid.UUID]:
+        t0 = time.perf_counter()
+        ranked = self.index.rank(viewer_id, candidate_ids)
+        self.rank_us.observe((time.perf_counter() - t0) * 1_000_000)
+        return ranked
+
+    def stats(self) -> dict:
+        return {"profiles": len(self.index), "rank_us": self.rank_us.snapshot()}
+
+
+local_ranker = LocalRanker()
+
+
+def profile_event(user_id: uuid.UUID, age: int, interests: list[str], created_at: datetime) -> dict:
+    return {
+        "type": PROFILE_EVENT,
+        "data": {
+            "user_id": str(user_id),
+            "age": age,
+            "interests": interests,
+            "created_at": created_at.isoformat(),
+        },
+    }
+
+
+def handle_profile_event(event: dict) -> None:
+    """
+    Hub listener for PROFILE_EVENT: applies a signup or profile edit to this worker's index.
+    """
+    data = event.get("data") or {}
+    local_ranker.index.upsert(
+        uuid.UUID(data["user_id"]),
+        int(data["age"]),
+        list(data.get("interests") or []),
+        datetime.fromisoformat(data["created_at"]),
+    )
+
+
+metrics.register("local_ranker", local_ranker.stats)
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.db.models import Message, Profile
+from app.utils.images import media_key
+
+# Uploads are stored once per content hash (see utils.images.blob_path); older ones under uuid4 names.
+BLOB_NAME = re.compile(r"^[0-9a-f]{64}\.\w+$")
+LEGACY_NAME = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.\w+$")
+# Resized copies written next to a photo: <stem>.<size>.<format> (see utils.thumbnails).
+VARIANT_NAME = re.compile(r"^(?P<stem>[^.]+)\.\d+\.(webp|jpeg)$")
+# Attachments are referenced only through their URL, which the client puts into the message text.
+# The URL prefix depends on settings (request host, PUBLIC_BASE_URL, MEDIA_CDN_URL) and may change
+# over time, so references are recognised by the stored name itself: the sharded content key or a
+# legacy uuid4 name anywhere in the text, or any other file name right after /static/.
+MEDIA_REF = re.compile(
+    r"(?<![0-9a-f])([0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.\w+)"
+    r"|(?<![0-9a-f-])([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.\w+)"
+    r"|/static/([\w-]+\.\w+)"
+)
+
+
+def reference_counts(db: Session, upload_dir: str) -> Counter[str]:
+    """
+    Number of references to every stored file (by media_key), from profile photos and from
+    attachment URLs in chat messages. Identical uploads share one file, so counts above one
+    are the deduplicated copies.
+    """
+    counts: Counter[str] = Counter()
+    for path in db.scalars(select(Profile.photo_path)):
+        counts[media_key(upload_dir, path)] += 1
+    # Cheap prefilter for the patterns above ("_" matches one character in LIKE).
+    might_link = or_(
+        Message.text.like("%/__/__/%"),
+        Message.text.like("%-____-____-____-%"),
+        Message.text.contains("/static/"),
+    )
+    texts = db.scalars(select(Message.text).where(might_link).execution_options(yield_per=1000))
+    for text in texts:
+        for groups in MEDIA_REF.findall(text):
+            counts.update(g for g in groups if g)
+    return counts
+
+
+@dataclass
+class GcReport:
+    files: int = 0
+    referenced: int = 0
+    shared: int = 0
+    kept_recent: int = 0
+    deleted: int = 0
+    freed_bytes: int = 0
+
+
+def collect_garbage(db: Session, upload_dir: str, min_age_s: float, dry_run: bool = True) -> GcReport:
+    """
+    Deletes stored uploads (and their variants) that nothing references and that are older than
+    `min_age_s`. Only content-addressed files written by save_upload are considered.
+    """
+    refs = reference_counts(db, upload_dir)
+    report = GcReport(shared=sum(1 for n in refs.values() if n > 1))
+    cutoff = time.time() - min_age_s
+
+    for dirpath, _, filenames in os.walk(upload_dir):
+        # Originals first: a variant goes only once no original with its stem is left.
+        kept_stems: set[str] = set()
+        for name in sorted(filenames, key=lambda n: VARIANT_NAME.match(n) is not None):
+            path = os.path.join(dirpath, name)
+            key = media_key(upload_dir, path)
+            variant = VARIANT_NAME.match(name)
+            if variant:
+                live = variant["stem"] in kept_stems
+            elif BLOB_NAME.match(name) or LEGACY_NAME.match(name):
+                live = key in refs
+            elif name.startswith(".upload-") and name.endswith(".part"):
+                live = False  # left behind by a crashed upload
+            else:
+                continue
+            report.files += 1
+            if live:
+                report.referenced += 1
+                kept_stems.add(name.split(".", 1)[0])
+                continue
+            stat = os.stat(path)
+            if stat.st_mtime > cutoff:
+                report.kept_recent += 1
+                kept_stems.add(name.split(".", 1)[0])
+                continue
+            report.deleted += 1
+            report.freed_bytes += stat.st_size
+            if not dry_run:
+                os.remove(path)
+    # Empty shard directories stay: removing one could race with an upload renaming into it.
+    return report
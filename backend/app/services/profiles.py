@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import uuid
+from collections import defaultdict
+
+from fastapi import Request
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import Profile, UserInterest
+from app.schemas.profile import ProfilePublic
+from app.services.image_variants import image_variants
+from app.utils.urls import static_url
+
+
+def hydrate_profiles(db: Session, request: Request, user_ids: list[uuid.UUID]) -> list[ProfilePublic]:
+    """
+    Builds ProfilePublic for every user id in two queries (profiles + interests), whatever the
+    number of ids. Keeps the input order; users without a profile are skipped.
+    """
+    if not user_ids:
+        return []
+    unique_ids = list(dict.fromkeys(user_ids))
+
+    profiles = {p.user_id: p for p in db.scalars(select(Profile).where(Profile.user_id.in_(unique_ids)))}
+    interests: dict[uuid.UUID, list[str]] = defaultdict(list)
+    rows = db.execute(
+        select(UserInterest.user_id, UserInterest.interest_key)
+        .where(UserInterest.user_id.in_(unique_ids))
+        .order_by(UserInterest.id)
+    )
+    for user_id, key in rows:
+        interests[user_id].append(key)
+
+    out: list[ProfilePublic] = []
+    for user_id in unique_ids:
+        profile = profiles.get(user_id)
+        if profile is None:
+            continue
+        out.append(
+            ProfilePublic(
+                user_id=user_id,
+                name=profile.name,
+                gender=profile.gender.value,
+                age=profile.age,
+                about=profile.about,
+                photo_url=static_url(request, profile.photo_path),
+                photo_urls=image_variants.urls(request, profile.photo_path),
+                interests=interests[user_id],
+            )
+        )
+    return out
+
+
+def hydrate_profile(db: Session, request: Request, user_id: uuid.UUID) -> ProfilePublic | None:
+    found = hydrate_profiles(db, request, [user_id])
+    return found[0] if found else None
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+import uuid
+
+from app.core import metrics
+from app.core.config import settings
+from app.utils.ttl_cache import TTLCache
+
+INVALIDATE_EVENT = "ranking.invalidate"
+
+
+class RankingCache:
+    """
+    Last reco ordering per viewer. Hits when every requested candidate was in the cached ranking,
+    and returns the cached order restricted to the request; any new candidate is a miss.
+    """
+
+    def __init__(self, maxsize: int, ttl_s: float) -> None:
+        # viewer id -> (candidate id -> rank, cost of the ranking call in ms)
+        self._entries: TTLCache[uuid.UUID, tuple[dict[uuid.UUID, int], float]] = TTLCache(maxsize, ttl_s)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+
+    def get(self, user_id: uuid.UUID, candidate_ids: list[uuid.UUID]) -> list[uuid.UUID] | None:
+        entry = self._entries.get(user_id)
+        if entry is None or any(i not in entry[0] for i in candidate_ids):
+            with self._lock:
+                self.misses += 1
+            return None
+        ranks, cost_ms = entry
+        with self._lock:
+            self.hits += 1
+            self.saved_ms += cost_ms
+        return sorted(candidate_ids, key=ranks.__getitem__)
+
+    def set(self, user_id: uuid.UUID, ranked_ids: list[uuid.UUID], cost_ms: float) -> None:
+        self._entries.set(user_id, ({x: i for i, x in enumerate(ranked_ids)}, cost_ms))
+
+    def invalidate(self, user_id: uuid.UUID) -> None:
+        self._entries.pop(user_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        size = self._entries.stats()["size"]
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "saved_ranker_ms": round(self.saved_ms, 1),
+            }
+
+
+ranking_cache = RankingCache(settings.reco_cache_size, settings.reco_cache_ttl_s)
+
+
+def invalidate_user(user_id: uuid.UUID) -> None:
+    ranking_cache.invalidate(user_id)
+
+
+def handle_invalidate(event: dict) -> None:
+    """
+    Hub listener for INVALIDATE_EVENT: a profile edited through another worker drops the cached
+    ranking here too.
+    """
+    data = event.get("data") or {}
+    if data.get("all"):
+        ranking_cache.clear()
+        return
+    for raw in data.get("user_ids") or []:
+        invalidate_user(uuid.UUID(raw))
+
+
+def invalidation_event(user_ids: list[uuid.UUID] | None = None) -> dict:
+    if user_ids is None:
+        return {"type": INVALIDATE_EVENT, "data": {"all": True}}
+    return {"type": INVALIDATE_EVENT, "data": {"user_ids": [str(x) for x in user_ids]}}
+
+
+metrics.register("ranking_cache", ranking_cache.stats)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from typing import Any, Callable, Protocol
+
+logger = logging.getLogger(__name__)
+
+Event = dict[str, Any]
+Deliver = Callable[[list[str], Event], None]
+
+
+class EventBackend(Protocol):
+    """
+    Transport between workers. `publish` may be called from any thread; the backend must end
+    up calling `deliver` on the event loop of every worker (including the publishing one).
+    """
+
+    async def start(self, loop: asyncio.AbstractEventLoop, deliver: Deliver) -> None: ...
+
+    async def stop(self) -> None: ...
+
+    def publish(self, user_ids: list[str], event: Event) -> None: ...
+
+
+class LocalBackend:
+    """
+    Single-process loopback. Enough for one worker and for tests.
+    """
+
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._deliver: Deliver | None = None
+
+    async def start(self, loop: asyncio.AbstractEventLoop, deliver: Deliver) -> None:
+        self._loop = loop
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        self._loop = None
+        self._deliver = None
+
+    def publish(self, user_ids: list[str], event: Event) -> None:
+        loop, deliver = self._loop, self._deliver
+        if loop is None or deliver is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(deliver, user_ids, event)
+
+
+class Hub:
+    """
+    In-process fan-out of events to this worker's WebSocket connections; a client whose bounded
+    queue is full loses events (it resyncs through the REST endpoints).
+    """
+
+    queue_size = 100
+
+    def __init__(self, backend: EventBackend | None = None) -> None:
+        self.backend: EventBackend = backend or LocalBackend()
+        self._subscribers: dict[str, set[asyncio.Queue[Event]]] = {}
+        self._listeners: dict[str, list[Callable[[Event], None]]] = {}
+        self._started = False
+
+    async def start(self) -> None:
+        if self._started:
+            return
+        await self.backend.start(asyncio.get_running_loop(), self._deliver)
+        self._started = True
+
+    async def stop(self) -> None:
+        if not self._started:
+            return
+        await self.backend.stop()
+        self._started = False
+
+    async def set_backend(self, backend: EventBackend) -> None:
+        """
+        Swaps the transport (e.g. for a stand-in in tests), restarting it if the hub is running.
+        """
+        was_started = self._started
+        await self.stop()
+        self.backend = backend
+        if was_started:
+            await self.start()
+
+    def add_listener(self, event_type: str, listener: Callable[[Event], None]) -> None:
+        """
+        Server-side handler for events of `event_type` (e.g. cache invalidation), called on the loop.
+        """
+        listeners = self._listeners.setdefault(event_type, [])
+        if listener not in listeners:
+            listeners.append(listener)
+
+    def subscribe(self, user_id: uuid.UUID) -> asyncio.Queue[Event]:
+        queue: asyncio.Queue[Event] = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(str(user_id), set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: uuid.UUID, queue: asyncio.Queue[Event]) -> None:
+        queues = self._subscribers.get(str(user_id))
+        if not queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            self._subscribers.pop(str(user_id), None)
+
+    def publish(self, user_ids: list[uuid.UUID], event: Event) -> None:
+        """
+        Thread-safe; call after the DB transaction that produced the event has committed.
+        """
+        if not self._started:
+            return
+        try:
+            self.backend.publish([str(x) for x in user_ids], event)
+        except Exception:
+            logger.exception("Realtime publish failed")
+
+    def _deliver(self, user_ids: list[str], event: Event) -> None:
+        for listener in self._listeners.get(event.get("type", ""), ()):
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Realtime listener failed")
+        for user_id in user_ids:
+            for queue in self._subscribers.get(user_id, ()):
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    logger.warning("Dropping realtime event for slow subscriber %s", user_id)
+
+
+hub = Hub()
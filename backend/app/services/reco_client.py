@@ -1,13 +1,109 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+import time
 import uuid
 
 import httpx
 
+from app.core import metrics
+from app.core.config import settings
+
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 200, 300, 500, 1000, 2000)
+
+
+class RecoUnavailableError(RuntimeError):
+    """
+    Raised instead of calling the service while the circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open -> half_open after
+    `reset_timeout_s`; in half_open one trial call decides between closed and open again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout_s: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout_s:
+                    return False
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """
+        Gives up a half-open trial without an outcome (the call was cancelled); the next call tries.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, "times_opened": self.times_opened}
+
 
 class RecoClient:
-    def __init__(self, base_url: str):
+    """
+    App-lifetime client: one pooled keep-alive httpx.AsyncClient, a per-call deadline and a
+    circuit breaker, so a slow or broken ranker costs the feed at most `timeout_ms`, and nothing
+    at all while the breaker is open.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout_ms: int = 300,
+        breaker_failures: int = 5,
+        breaker_reset_s: float = 30,
+    ):
         self.base_url = base_url.rstrip("/")
+        self.timeout_s = timeout_ms / 1000
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset_s)
+        self.latency_ms = metrics.Histogram(LATENCY_BUCKETS_MS)
+        self.counters = {"calls": 0, "ok": 0, "errors": 0, "timeouts": 0, "short_circuited": 0}
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout_s,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30),
+        )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
 
     async def rank_candidates(self, user_id: uuid.UUID, candidate_ids: list[uuid.UUID]) -> list[uuid.UUID]:
         """
@@ -15,20 +111,80 @@ class RecoClient:
         POST {base_url}/rank
         body: { "user_id": "...", "candidate_ids": ["...","..."] }
         resp: { "ranked_candidate_ids": ["...","..."] }
+
+        Raises RecoUnavailableError while the breaker is open, TimeoutError past the deadline,
+        httpx errors otherwise.
         """
-        async with httpx.AsyncClient(timeout=10) as client:
-            r = await client.post(
-                f"{self.base_url}/rank",
-                json={"user_id": str(user_id), "candidate_ids": [str(x) for x in candidate_ids]},
-            )
-            r.raise_for_status()
-            data = r.json()
+        if not self.breaker.allow():
+            self.counters["short_circuited"] += 1
+            raise RecoUnavailableError("Reco service circuit breaker is open")
+
+        self.counters["calls"] += 1
+        t0 = time.perf_counter()
+        try:
+            # httpx applies its timeout per phase (connect, each read, ...); a ranker trickling its
+            # response could exceed timeout_ms many times over, so the whole call gets one deadline.
+            data = await asyncio.wait_for(self._post_rank(user_id, candidate_ids), self.timeout_s)
             ranked = [uuid.UUID(x) for x in data.get("ranked_candidate_ids", [])]
-            if not ranked:
-                return candidate_ids
-            # Keep only known ids + append leftovers
-            ranked_set = set(ranked)
-            leftovers = [x for x in candidate_ids if x not in ranked_set]
-            return ranked + leftovers
+        except (httpx.TimeoutException, TimeoutError):
+            self.counters["timeouts"] += 1
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            self.counters["errors"] += 1
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled (client gone, an outer timeout): says nothing about the service.
+            self.breaker.release_trial()
+            raise
+        finally:
+            self.latency_ms.observe((time.perf_counter() - t0) * 1000)
+
+        self.counters["ok"] += 1
+        self.breaker.record_success()
+        if not ranked:
+            return candidate_ids
+        # Keep only known ids + append leftovers
+        ranked_set = set(ranked)
+        leftovers = [x for x in candidate_ids if x not in ranked_set]
+        return ranked + leftovers
+
+    async def _post_rank(self, user_id: uuid.UUID, candidate_ids: list[uuid.UUID]) -> dict:
+        r = await self._client.post(
+            "/rank",
+            json={"user_id": str(user_id), "candidate_ids": [str(x) for x in candidate_ids]},
+        )
+        r.raise_for_status()
+        return r.json()
+
+    def stats(self) -> dict:
+        return {**self.counters, "breaker": self.breaker.snapshot(), "latency_ms": self.latency_ms.snapshot()}
+
+
+_client: RecoClient | None = None
+
+
+def get_reco_client() -> RecoClient | None:
+    """
+    The process-wide client, created on first use; None when RECO_SERVICE_URL is not set.
+    """
+    global _client
+    if _client is None and settings.reco_service_url:
+        _client = RecoClient(
+            settings.reco_service_url,
+            timeout_ms=settings.reco_timeout_ms,
+            breaker_failures=settings.reco_breaker_failures,
+            breaker_reset_s=settings.reco_breaker_reset_s,
+        )
+    return _client
+
+
+async def close_reco_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
 
+metrics.register("reco", lambda: _client.stats() if _client is not None else {"configured": bool(settings.reco_service_url)})
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.models import SupportMessage, epoch_seconds
+from app.services.gigachat_client import is_model_answer
+
+# Hashed character trigram space; collisions only blur near-zero similarities.
+DIMS = 1 << 16
+NGRAM = 3
+# Shorter questions ("привет", "?") say too little to reuse an answer by similarity.
+MIN_SIMILAR_CHARS = 12
+LOOKUP_BUCKETS_US = (50, 100, 500, 1000, 5000, 10000)
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize(text: str) -> str:
+    """
+    Case, ё/е, punctuation and whitespace differences do not make a different question.
+    """
+    return _NON_WORD.sub(" ", text.lower().replace("ё", "е")).strip()
+
+
+def _features(normalized: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sorted unique hashed trigram ids of the padded words and their sublinear tf (1 + log count).
+    """
+    grams = [
+        padded[i : i + NGRAM]
+        for word in normalized.split()
+        for padded in (f" {word} ",)
+        for i in range(max(1, len(padded) - NGRAM + 1))
+    ]
+    hashed = np.fromiter((hash(g) & (DIMS - 1) for g in grams), dtype=np.int64, count=len(grams))
+    idx, counts = np.unique(hashed, return_counts=True)
+    return idx, (1.0 + np.log(counts)).astype(np.float32)
+
+
+@dataclass(frozen=True)
+class _Entry:
+    question: str
+    answer: str
+    expires_at: float
+    idx: np.ndarray
+    tf: np.ndarray
+
+
+class SupportAnswerCache:
+    """
+    Previous assistant replies indexed by the question they answered, matched on normalized text
+    or on TF-IDF cosine similarity over hashed character trigrams (at least `threshold`).
+    """
+
+    def __init__(self, maxsize: int, ttl_s: float, threshold: float) -> None:
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._entries: deque[_Entry] = deque()
+        self._exact: dict[str, _Entry] = {}
+        self._df = np.zeros(DIMS, dtype=np.int32)
+        self._arrays: tuple[np.ndarray, np.ndarray, np.ndarray] | None = None
+        self.lookup_us = metrics.Histogram(LOOKUP_BUCKETS_US)
+        self.counters = {"exact_hits": 0, "similar_hits": 0, "misses": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, question: str, answer: str, created_at: float | None = None) -> None:
+        normalized = normalize(question)
+        if not normalized or not is_model_answer(answer):
+            return
+        expires_at = (time.time() if created_at is None else created_at) + self.ttl_s
+        if expires_at <= time.time():
+            return
+        idx, tf = _features(normalized)
+        entry = _Entry(normalized, answer, expires_at, idx, tf)
+        with self._lock:
+            self._entries.append(entry)
+            self._exact[normalized] = entry
+            self._df[idx] += 1
+            while len(self._entries) > self.maxsize:
+                self._drop_oldest()
+            self._arrays = None
+
+    def _drop_oldest(self) -> None:
+        old = self._entries.popleft()
+        self._df[old.idx] -= 1
+        if self._exact.get(old.question) is old:
+            del self._exact[old.question]
+
+    def _expire(self, now: float) -> None:
+        dropped = False
+        # Entries are appended in time order with the same TTL, so expired ones are at the front.
+        while self._entries and self._entries[0].expires_at <= now:
+            self._drop_oldest()
+            dropped = True
+        if dropped:
+            self._arrays = None
+
+    def _csr(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._arrays is None:
+            entries = list(self._entries)
+            lengths = np.fromiter((len(e.idx) for e in entries), dtype=np.int64, count=len(entries))
+            starts = np.zeros(len(entries), dtype=np.int64)
+            np.cumsum(lengths[:-1], out=starts[1:])
+            self._arrays = (
+                np.concatenate([e.idx for e in entries]),
+                np.concatenate([e.tf for e in entries]),
+                starts,
+            )
+        return self._arrays
+
+    def lookup(self, question: str) -> str | None:
+        t0 = time.perf_counter()
+        try:
+            return self._lookup(normalize(question))
+        finally:
+            self.lookup_us.observe((time.perf_counter() - t0) * 1_000_000)
+
+    def _lookup(self, normalized: str) -> str | None:
+        with self._lock:
+            self._expire(time.time())
+            exact = self._exact.get(normalized)
+            if exact is not None:
+                self.counters["exact_hits"] += 1
+                return exact.answer
+            if len(normalized) < MIN_SIMILAR_CHARS or not self._entries:
+                self.counters["misses"] += 1
+                return None
+
+            ids, tf, starts = self._csr()
+            n_docs = len(self._entries)
+            idf = (np.log((1.0 + n_docs) / (1.0 + self._df)) + 1.0).astype(np.float32)
+            q_idx, q_tf = _features(normalized)
+            query = np.zeros(DIMS, dtype=np.float32)
+            query[q_idx] = q_tf * idf[q_idx]
+            q_norm = float(np.linalg.norm(query[q_idx]))
+
+            weights = tf * idf[ids]
+            dots = np.add.reduceat(query[ids] * weights, starts)
+            norms = np.sqrt(np.add.reduceat(weights * weights, starts))
+            sims = dots / np.maximum(norms * q_norm, 1e-9)
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                self.counters["misses"] += 1
+                return None
+            self.counters["similar_hits"] += 1
+            return self._entries[best].answer
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.counters["exact_hits"] + self.counters["similar_hits"]
+            total = hits + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_ratio": round(hits / total, 4) if total else 0.0,
+                "entries": len(self._entries),
+                "lookup_us": self.lookup_us.snapshot(),
+            }
+
+
+def load_pairs(db: Session, since: datetime, limit: int) -> list[tuple[str, str, datetime]]:
+    """
+    (question, answer, answered at) from support history since `since`, oldest first: each
+    assistant message paired with the user message right before it in the same conversation.
+    """
+    rows = db.execute(
+        select(SupportMessage.user_id, SupportMessage.role, SupportMessage.text, SupportMessage.created_at)
+        .where(SupportMessage.created_at >= since)
+        .order_by(SupportMessage.created_at.desc(), SupportMessage.id.desc())
+        .limit(limit * 2)
+    ).all()
+    pairs: list[tuple[str, str, datetime]] = []
+    last_question: dict = {}
+    # Oldest first; a question and its reply may share a timestamp, the question goes first.
+    for user_id, role, text, created_at in sorted(rows, key=lambda r: (r.created_at, r.role != "user")):
+        if role == "user":
+            last_question[user_id] = text
+        elif role == "assistant" and user_id in last_question:
+            pairs.append((last_question.pop(user_id), text, created_at))
+    return pairs[-limit:]
+
+
+def warm_up(db: Session) -> int:
+    """
+    Fills the cache from recent support history (runs once per worker at startup).
+    """
+    since = datetime.now(timezone.utc) - timedelta(seconds=settings.support_cache_ttl_s)
+    pairs = load_pairs(db, since, settings.support_cache_size)
+    for question, answer, created_at in pairs:
+        support_answers.add(question, answer, epoch_seconds(created_at))
+    return len(pairs)
+
+
+support_answers = SupportAnswerCache(
+    settings.support_cache_size,
+    settings.support_cache_ttl_s,
+    settings.support_cache_threshold,
+)
+
+metrics.register("support_cache", support_answers.stats)
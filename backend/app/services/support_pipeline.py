@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Literal
+
+from starlette.concurrency import iterate_in_threadpool
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.models import SupportMessage
+from app.db.session import AsyncSessionLocal
+from app.schemas.support import SupportMessageItem
+from app.services.gigachat_client import GigaChatClient
+from app.services.support_answers import support_answers
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# ("delta", str) pieces, then exactly one ("done", SupportMessageItem) or ("error", str).
+ReplyEvent = tuple[Literal["delta", "done", "error"], object]
+
+
+@dataclass
+class SupportReply:
+    """
+    One assistant reply being generated in the background. `task` resolves to the persisted
+    message; `events` streams it as it is produced.
+    """
+
+    task: asyncio.Task
+    queue: asyncio.Queue[ReplyEvent] = field(default_factory=asyncio.Queue)
+
+    async def events(self) -> AsyncIterator[ReplyEvent]:
+        while True:
+            kind, payload = await self.queue.get()
+            yield kind, payload
+            if kind != "delta":
+                return
+
+
+class SupportPipeline:
+    """
+    Generates support replies in background tasks, off the request path; the reply is saved in
+    its own session when done, whether or not the client is still connected.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: set[asyncio.Task] = set()
+        self.first_piece_ms = metrics.Histogram(LATENCY_BUCKETS_MS)
+        self.total_ms = metrics.Histogram(LATENCY_BUCKETS_MS)
+        self.counters = {"started": 0, "completed": 0, "failed": 0}
+
+    def start(self, user_id: uuid.UUID, text: str) -> SupportReply:
+        queue: asyncio.Queue[ReplyEvent] = asyncio.Queue()
+        task = asyncio.create_task(self._run(user_id, text, queue))
+        self._tasks.add(task)  # the loop keeps only weak references to tasks
+        task.add_done_callback(self._finished)
+        self.counters["started"] += 1
+        return SupportReply(task=task, queue=queue)
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled():
+            task.exception()  # already logged in _run; mark retrieved for streamed replies
+
+    async def _run(self, user_id: uuid.UUID, text: str, queue: asyncio.Queue[ReplyEvent]) -> SupportMessageItem:
+        t0 = time.perf_counter()
+        try:
+            parts: list[str] = []
+            cached = support_answers.lookup(text) if settings.support_cache_enabled else None
+            if cached is not None:
+                parts.append(cached)
+                queue.put_nowait(("delta", cached))
+                self.first_piece_ms.observe((time.perf_counter() - t0) * 1000)
+            else:
+                async for piece in iterate_in_threadpool(GigaChatClient().stream_support(text)):
+                    if not parts:
+                        self.first_piece_ms.observe((time.perf_counter() - t0) * 1000)
+                    parts.append(piece)
+                    queue.put_nowait(("delta", piece))
+                if settings.support_cache_enabled:
+                    support_answers.add(text, "".join(parts))
+
+            async with AsyncSessionLocal() as db:
+                msg = SupportMessage(user_id=user_id, role="assistant", text="".join(parts))
+                db.add(msg)
+                await db.commit()
+                await db.refresh(msg)
+            item = SupportMessageItem(id=msg.id, role=msg.role, text=msg.text, created_at=msg.created_at)
+        except Exception:
+            self.counters["failed"] += 1
+            logger.exception("Support reply failed")
+            queue.put_nowait(("error", "Support reply failed"))
+            raise
+        self.counters["completed"] += 1
+        self.total_ms.observe((time.perf_counter() - t0) * 1000)
+        queue.put_nowait(("done", item))
+        return item
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "in_flight": len(self._tasks),
+            "first_piece_ms": self.first_piece_ms.snapshot(),
+            "total_ms": self.total_ms.snapshot(),
+        }
+
+
+support_pipeline = SupportPipeline()
+
+metrics.register("support", support_pipeline.stats)
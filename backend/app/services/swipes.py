@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy.orm import Session
+
+from app.db.models import Chat, Swipe, SwipeDirection
+from app.db.upsert import dialect_insert
+from app.services import feed_queue
+
+
+@dataclass(frozen=True)
+class SwipeResult:
+    chat_id: uuid.UUID | None = None
+    # True only for the request that actually inserted the chat (publish the match once).
+    new_match: bool = False
+
+
+def chat_pair(a: uuid.UUID, b: uuid.UUID) -> tuple[uuid.UUID, uuid.UUID]:
+    return (a, b) if str(a) < str(b) else (b, a)
+
+
+def apply_swipe(db: Session, user_id: uuid.UUID, target_id: uuid.UUID, direction: SwipeDirection) -> SwipeResult:
+    return apply_swipes(db, user_id, [(target_id, direction)])[0]
+
+
+def apply_swipes(
+    db: Session, user_id: uuid.UUID, items: list[tuple[uuid.UUID, SwipeDirection]]
+) -> list[SwipeResult]:
+    """
+    Records swipes in order and makes sure a chat exists for right swipes, with one multi-row
+    ON CONFLICT upsert per table; repeated targets are collapsed first (last direction wins).
+    Returns one result per item.
+    """
+    final: dict[uuid.UUID, SwipeDirection] = {}
+    for target_id, direction in items:
+        final[target_id] = direction
+
+    stmt = dialect_insert(db, Swipe).values(
+        [
+            {"id": uuid.uuid4(), "user_id": user_id, "target_user_id": target_id, "direction": direction}
+            for target_id, direction in final.items()
+        ]
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[Swipe.user_id, Swipe.target_user_id],
+            set_={"direction": stmt.excluded.direction},
+        )
+    )
+    feed_queue.pop(db, user_id, list(final))
+
+    proposed: dict[tuple[uuid.UUID, uuid.UUID], uuid.UUID] = {}
+    for target_id, direction in items:
+        if direction == SwipeDirection.right:
+            proposed.setdefault(chat_pair(user_id, target_id), uuid.uuid4())
+    chats: dict[tuple[uuid.UUID, uuid.UUID], uuid.UUID] = {}
+    if proposed:
+        stmt = dialect_insert(db, Chat).values(
+            [{"id": chat_id, "user_a_id": a, "user_b_id": b} for (a, b), chat_id in proposed.items()]
+        )
+        rows = db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[Chat.user_a_id, Chat.user_b_id],
+                set_={"user_a_id": stmt.excluded.user_a_id},
+            ).returning(Chat.id, Chat.user_a_id, Chat.user_b_id)
+        )
+        chats = {(r.user_a_id, r.user_b_id): r.id for r in rows}
+
+    results: list[SwipeResult] = []
+    announced: set[tuple[uuid.UUID, uuid.UUID]] = set()
+    for target_id, direction in items:
+        if direction != SwipeDirection.right:
+            results.append(SwipeResult())
+            continue
+        pair = chat_pair(user_id, target_id)
+        new_match = chats[pair] == proposed[pair] and pair not in announced
+        announced.add(pair)
+        results.append(SwipeResult(chat_id=chats[pair], new_match=new_match))
+    return results
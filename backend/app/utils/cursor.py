@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import base64
+import uuid
+from datetime import datetime
+
+from sqlalchemy import ColumnElement, literal, tuple_
+
+
+def encode_cursor(ts: datetime, row_id: uuid.UUID) -> str:
+    """
+    Opaque keyset cursor for (timestamp, id) ordered lists.
+    """
+    raw = f"{ts.isoformat()}|{row_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """
+    Raises ValueError on malformed input (callers turn it into HTTP 400).
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+        ts_raw, id_raw = raw.split("|", 1)
+        return datetime.fromisoformat(ts_raw), uuid.UUID(id_raw)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_before(ts_col, id_col, after: tuple[datetime, uuid.UUID]) -> ColumnElement[bool]:
+    """
+    (ts_col, id_col) < cursor, for lists ordered by ts DESC, id DESC.
+    Cursor values are bound with the column types so dialect-specific storage formats apply.
+    """
+    ts, row_id = after
+    return tuple_(ts_col, id_col) < tuple_(literal(ts, ts_col.type), literal(row_id, id_col.type))
+
+
+def keyset_after(ts_col, id_col, after: tuple[datetime, uuid.UUID]) -> ColumnElement[bool]:
+    """
+    (ts_col, id_col) > cursor, for lists ordered by ts ASC, id ASC.
+    """
+    ts, row_id = after
+    return tuple_(ts_col, id_col) > tuple_(literal(ts, ts_col.type), literal(row_id, id_col.type))
+
+
+def encode_position_cursor(position: int) -> str:
+    """
+    Opaque cursor for lists ordered by an integer position (e.g. the feed queue).
+    """
+    return base64.urlsafe_b64encode(f"pos|{position}".encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_position_cursor(cursor: str) -> int:
+    """
+    Raises ValueError on malformed input, including keyset cursors from encode_cursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+        kind, value = raw.split("|", 1)
+        if kind != "pos":
+            raise ValueError(kind)
+        return int(value)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
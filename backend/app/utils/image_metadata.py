@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import os
+import struct
+import uuid
+import zlib
+from typing import BinaryIO
+
+from PIL import Image
+
+ORIENTATION = 0x0112
+# JPEG segments that carry metadata: APP1 (EXIF, XMP), APP3-APP13 (IPTC, maker data), APP15, COM,
+# and APP2 unless it is an ICC profile (MPF indexes extra images appended after the main one).
+# APP0 (JFIF), ICC profiles and APP14 (Adobe colour transform) affect decoding and are kept.
+_JPEG_DROP = {0xE1, *range(0xE3, 0xEE), 0xEF, 0xFE}
+_PNG_DROP = {b"eXIf", b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+_WEBP_DROP = {b"EXIF", b"XMP "}
+_WEBP_EXIF_FLAG, _WEBP_XMP_FLAG = 0x08, 0x04
+
+
+def _orientation(exif: bytes) -> int:
+    try:
+        info = Image.Exif()
+        info.load(exif)
+        return int(info.get(ORIENTATION, 1))
+    except Exception:
+        return 1
+
+
+def _orientation_exif(orientation: int) -> bytes | None:
+    """
+    TIFF data (with the "Exif\\0\\0" prefix) holding only the orientation; None when upright.
+    """
+    if orientation in (0, 1):
+        return None
+    info = Image.Exif()
+    info[ORIENTATION] = orientation
+    return info.tobytes()
+
+
+def _jpeg_end(f: BinaryIO, scan_start: int) -> int:
+    """
+    Offset just past the EOI marker. Entropy-coded data never contains FF D9, so the first one
+    after the scan start ends the image; anything after it (secondary images with their own
+    EXIF, trailers) is not part of the photo.
+    """
+    f.seek(scan_start)
+    pos, prev = scan_start, b""
+    while chunk := f.read(256 * 1024):
+        end = (prev + chunk).find(b"\xff\xd9")
+        if end >= 0:
+            return pos - len(prev) + end + 2
+        pos += len(chunk)
+        prev = chunk[-1:]
+    return pos
+
+
+def _copy(src: BinaryIO, out: BinaryIO, size: int) -> None:
+    while size > 0:
+        chunk = src.read(min(size, 256 * 1024))
+        if not chunk:
+            raise ValueError("Truncated image")
+        out.write(chunk)
+        size -= len(chunk)
+
+
+def _jpeg_segments(f: BinaryIO) -> list[tuple[int, int, int]] | None:
+    """
+    (marker, offset, length incl. marker) of every segment before the scan data.
+    """
+    segments = []
+    while True:
+        offset = f.tell()
+        head = f.read(4)
+        if len(head) < 4 or head[0] != 0xFF:
+            return None
+        marker = head[1]
+        if marker == 0xFF:  # fill byte before a marker
+            f.seek(offset + 1)
+            continue
+        if marker == 0xDA:  # start of scan: the rest is entropy-coded data
+            segments.append((marker, offset, -1))
+            return segments
+        (length,) = struct.unpack(">H", head[2:])
+        segments.append((marker, offset, length + 2))
+        f.seek(offset + length + 2)
+
+
+def _strip_jpeg(f: BinaryIO, out_path: str) -> bool:
+    f.seek(2)
+    segments = _jpeg_segments(f)
+    if segments is None:
+        return False
+    orientation, kept_exif = 1, None
+    drop = set()
+    for marker, offset, length in segments:
+        if marker in (0xE1, 0xE2):
+            f.seek(offset + 4)
+            data = f.read(length - 4)
+            if marker == 0xE1 and data.startswith(b"Exif\0\0") and kept_exif is None:
+                orientation = _orientation(data)
+                if data == _orientation_exif(orientation):
+                    kept_exif = offset  # already stripped
+                    continue
+            if marker == 0xE2 and data.startswith(b"ICC_PROFILE\0"):
+                continue
+        if marker in _JPEG_DROP or marker == 0xE2:
+            drop.add(offset)
+    scan_start = segments[-1][1]
+    end = _jpeg_end(f, scan_start)
+    f.seek(end)
+    trailer = any(chunk.strip(b"\0") for chunk in iter(lambda: f.read(256 * 1024), b""))
+    if not drop and not trailer:
+        return False
+    with open(out_path, "wb") as out:
+        out.write(b"\xff\xd8")
+        exif = None if kept_exif is not None else _orientation_exif(orientation)
+        for marker, offset, length in segments:
+            if exif is not None and marker != 0xE0:
+                # Right after JFIF (APP0), where readers expect EXIF.
+                out.write(b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif)
+                exif = None
+            if offset in drop:
+                continue
+            f.seek(offset)
+            _copy(f, out, end - offset if marker == 0xDA else length)
+    return True
+
+
+def _strip_png(f: BinaryIO, out_path: str) -> bool:
+    f.seek(8)
+    chunks = []
+    while head := f.read(8):
+        if len(head) < 8:
+            return False
+        length, kind = struct.unpack(">I4s", head)
+        chunks.append((kind, f.tell() - 8, length + 12))
+        if kind == b"IEND":
+            break
+        f.seek(length + 4, os.SEEK_CUR)
+    orientation, kept_exif = 1, None
+    for kind, offset, length in chunks:
+        if kind == b"eXIf":
+            f.seek(offset + 8)
+            data = f.read(length - 12)
+            orientation = _orientation(data)
+            exif = _orientation_exif(orientation)
+            if exif is not None and data == exif[6:]:
+                kept_exif = offset  # already stripped
+    drop = {offset for kind, offset, _ in chunks if kind in _PNG_DROP and offset != kept_exif}
+    if not drop:
+        return False
+    exif = None if kept_exif is not None else _orientation_exif(orientation)
+    with open(out_path, "wb") as out:
+        out.write(b"\x89PNG\r\n\x1a\n")
+        for kind, offset, length in chunks:
+            if offset in drop:
+                continue
+            if exif is not None and kind == b"IDAT":
+                # eXIf has to come before the image data.
+                data = b"eXIf" + exif[6:]
+                out.write(struct.pack(">I", len(data) - 4) + data + struct.pack(">I", zlib.crc32(data)))
+                exif = None
+            f.seek(offset)
+            _copy(f, out, length)
+    return True
+
+
+def _strip_webp(f: BinaryIO, out_path: str) -> bool:
+    f.seek(12)
+    chunks = []
+    while head := f.read(8):
+        if len(head) < 8:
+            return False
+        kind, size = struct.unpack("<4sI", head)
+        chunks.append((kind, f.tell() - 8, 8 + size + (size & 1)))
+        f.seek(size + (size & 1), os.SEEK_CUR)
+    orientation, already_stripped = 1, True
+    for kind, offset, length in chunks:
+        if kind == b"EXIF":
+            f.seek(offset + 8)
+            data = f.read(length - 8)
+            orientation = _orientation(data)
+            exif = _orientation_exif(orientation)
+            tiff = exif[6:] if exif is not None else None
+            already_stripped = already_stripped and tiff is not None and data == tiff + b"\0" * (len(tiff) & 1)
+        elif kind in _WEBP_DROP:
+            already_stripped = False
+    if already_stripped:
+        return False
+    exif = _orientation_exif(orientation)
+    kept = [c for c in chunks if c[0] not in _WEBP_DROP]
+    if exif is None or not any(kind == b"VP8X" for kind, _, _ in kept):
+        exif_chunk = b""
+    else:
+        tiff = exif[6:]
+        exif_chunk = b"EXIF" + struct.pack("<I", len(tiff)) + tiff + b"\0" * (len(tiff) & 1)
+    with open(out_path, "wb") as out:
+        size = 4 + sum(length for _, _, length in kept) + len(exif_chunk)
+        out.write(b"RIFF" + struct.pack("<I", size) + b"WEBP")
+        for kind, offset, length in kept:
+            f.seek(offset)
+            if kind == b"VP8X":
+                data = bytearray(f.read(length))
+                data[8] &= ~(_WEBP_EXIF_FLAG | _WEBP_XMP_FLAG) & 0xFF
+                if exif_chunk:
+                    data[8] |= _WEBP_EXIF_FLAG
+                out.write(data)
+            else:
+                _copy(f, out, length)
+        # EXIF goes after the image data.
+        out.write(exif_chunk)
+    return True
+
+
+def strip_metadata(path: str) -> bool:
+    """
+    Rewrites the JPEG, PNG or WebP file at `path` without EXIF/GPS, XMP, IPTC and text metadata,
+    keeping only the EXIF orientation. Lossless: segments are dropped, pixels are not re-encoded.
+    Other files and files without such metadata are left alone. True when the file was rewritten.
+    """
+    part = f"{path}.{uuid.uuid4().hex}.strip"
+    try:
+        with open(path, "rb") as f:
+            magic = f.read(12)
+            if magic.startswith(b"\xff\xd8"):
+                changed = _strip_jpeg(f, part)
+            elif magic.startswith(b"\x89PNG\r\n\x1a\n"):
+                changed = _strip_png(f, part)
+            elif magic[:4] == b"RIFF" and magic[8:12] == b"WEBP":
+                changed = _strip_webp(f, part)
+            else:
+                changed = False
+        if changed:
+            os.replace(part, path)
+        return changed
+    except (ValueError, struct.error):
+        return False
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
@@ -1,27 +1,128 @@
 from __future__ import annotations
 
+import hashlib
 import os
 import uuid
 from pathlib import Path
+from typing import BinaryIO
 
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.image_metadata import strip_metadata
+
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+# Bytes copied per read/write; peak memory per upload stays at one chunk whatever the file size.
+CHUNK_SIZE = 256 * 1024
+
+
+class UploadTooLarge(ValueError):
+    def __init__(self, max_bytes: int) -> None:
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
 
 
 def ensure_dir(path: str) -> None:
     Path(path).mkdir(parents=True, exist_ok=True)
 
 
-def save_upload(upload_dir: str, file: UploadFile) -> str:
-    ensure_dir(upload_dir)
+def blob_path(upload_dir: str, digest: str, ext: str) -> Path:
+    """
+    Content-addressed location of a stored file: <upload_dir>/ab/cd/abcd...<ext>, sharded on the
+    first hex digits of its SHA-256 so no directory grows past a few thousand entries.
+    """
+    return Path(upload_dir) / digest[:2] / digest[2:4] / f"{digest}{ext}"
+
+
+def media_key(upload_dir: str, file_path: str) -> str:
+    """
+    Path of a stored file relative to `upload_dir` with "/" separators, as used in /static URLs
+    ("ab/cd/<sha256>.jpg"; a bare file name for files stored before content addressing).
+    """
+    rel = os.path.relpath(os.path.abspath(file_path), os.path.abspath(upload_dir))
+    if rel.startswith(".."):
+        return os.path.basename(file_path)
+    return rel.replace(os.sep, "/")
+
+
+def _extension(file: UploadFile, max_bytes: int | None) -> str:
+    # The multipart parser already knows the size; oversized files are rejected before any copy.
+    if max_bytes is not None and file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
     _, ext = os.path.splitext(file.filename or "")
     ext = (ext or ".jpg").lower()
-    if ext not in {".jpg", ".jpeg", ".png", ".webp"}:
-        ext = ".jpg"
+    return ext if ext in ALLOWED_EXTENSIONS else ".jpg"
+
 
-    name = f"{uuid.uuid4()}{ext}"
-    out_path = Path(upload_dir) / name
-    with out_path.open("wb") as f:
-        f.write(file.file.read())
+def _open_part(upload_dir: str) -> tuple[Path, BinaryIO]:
+    ensure_dir(upload_dir)
+    # Same filesystem as the final location, so the closing rename is atomic.
+    part = Path(upload_dir) / f".upload-{uuid.uuid4()}.part"
+    return part, part.open("xb")
+
+
+def _write(out: BinaryIO, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    out.write(chunk)
+
+
+def _discard(part: Path, out: BinaryIO) -> None:
+    out.close()
+    part.unlink(missing_ok=True)
+
+
+def _finish(part: Path, out: BinaryIO, upload_dir: str, digest, ext: str) -> str:
+    out.close()
+    if strip_metadata(str(part)):
+        # Stored bytes changed; the blob is addressed by what is actually served.
+        with part.open("rb") as f:
+            digest = hashlib.file_digest(f, "sha256")
+    out_path = blob_path(upload_dir, digest.hexdigest(), ext)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    # Replacing an existing blob swaps in identical bytes; it also refreshes its mtime, which
+    # keeps the media GC from collecting a blob that was just uploaded again.
+    os.replace(part, out_path)
     return str(out_path)
 
 
+def save_upload(upload_dir: str, file: UploadFile, max_bytes: int | None = None) -> str:
+    """
+    Copies the upload into `upload_dir` chunk by chunk via a temp file and an atomic rename, and
+    returns the stored path (see blob_path); images lose their EXIF/GPS metadata losslessly (see
+    image_metadata). Raises UploadTooLarge as soon as more than `max_bytes` have been read.
+    """
+    ext = _extension(file, max_bytes)
+    digest = hashlib.sha256()
+    part, out = _open_part(upload_dir)
+    try:
+        written = 0
+        while chunk := file.file.read(CHUNK_SIZE):
+            written += len(chunk)
+            if max_bytes is not None and written > max_bytes:
+                raise UploadTooLarge(max_bytes)
+            _write(out, digest, chunk)
+        return _finish(part, out, upload_dir, digest, ext)
+    except BaseException:
+        _discard(part, out)
+        raise
+
+
+async def save_upload_async(upload_dir: str, file: UploadFile, max_bytes: int | None = None) -> str:
+    """
+    save_upload for async routes: hashing and file I/O run in the threadpool one chunk at a
+    time, so the event loop is never blocked on disk and no thread is held for the whole copy.
+    """
+    ext = _extension(file, max_bytes)
+    digest = hashlib.sha256()
+    part, out = await run_in_threadpool(_open_part, upload_dir)
+    try:
+        written = 0
+        while chunk := await file.read(CHUNK_SIZE):
+            written += len(chunk)
+            if max_bytes is not None and written > max_bytes:
+                raise UploadTooLarge(max_bytes)
+            await run_in_threadpool(_write, out, digest, chunk)
+        return await run_in_threadpool(_finish, part, out, upload_dir, digest, ext)
+    except BaseException:
+        await run_in_threadpool(_discard, part, out)
+        raise
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import os
+import re
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Scope
+
+# Content-addressed uploads and their resized variants: <sha256>.<ext> / <sha256>.<size>.<fmt>.
+CONTENT_ADDRESSED = re.compile(r"^(?P<digest>[0-9a-f]{64})(?P<variant>\.\d+)?\.\w+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Anything else (default avatar, files stored before content addressing) is revalidated.
+REVALIDATE = "no-cache"
+
+
+class MediaFiles(StaticFiles):
+    """
+    /static with HTTP caching that matches how uploads are stored: content-addressed files are
+    immutable (originals carry their SHA-256 as ETag), anything else is revalidated. With
+    `accel_redirect_prefix` set, the body is left to nginx via X-Accel-Redirect.
+    """
+
+    def __init__(self, *, directory: PathLike, accel_redirect_prefix: str | None = None) -> None:
+        super().__init__(directory=directory)
+        self.accel_redirect_prefix = accel_redirect_prefix.rstrip("/") if accel_redirect_prefix else None
+        self.counters = {"full": 0, "partial": 0, "not_modified": 0, "redirected": 0}
+
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        match = CONTENT_ADDRESSED.match(os.path.basename(full_path))
+        headers = {"cache-control": IMMUTABLE if match else REVALIDATE}
+        if match and not match["variant"]:
+            headers["etag"] = f'"{match["digest"]}"'
+
+        response = FileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, request_headers):
+            self.counters["not_modified"] += 1
+            return NotModifiedResponse(response.headers)
+        if self.accel_redirect_prefix is not None and status_code == 200:
+            self.counters["redirected"] += 1
+            return self._accel_redirect(full_path, response)
+        self.counters["partial" if "range" in request_headers else "full"] += 1
+        return response
+
+    def _accel_redirect(self, full_path: PathLike, response: FileResponse) -> Response:
+        rel = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        headers = {
+            key: response.headers[key]
+            for key in ("cache-control", "etag", "last-modified", "content-type")
+            if key in response.headers
+        }
+        headers["x-accel-redirect"] = f"{self.accel_redirect_prefix}/{rel}"
+        return Response(headers=headers)
+
+    def stats(self) -> dict:
+        return dict(self.counters)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import os
+import uuid
+
+from PIL import Image, ImageOps
+
+# Variant name -> longest side in pixels, largest first (each one is scaled from the previous).
+VARIANT_SIZES = {"full": 1080, "card": 512, "avatar": 128}
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+
+
+def variant_path(path: str, variant: str, fmt: str) -> str:
+    """
+    Where the `variant` rendition of the upload at `path` lives: next to it, e.g.
+    uploads/<id>.jpg -> uploads/<id>.512.webp.
+    """
+    stem, _ = os.path.splitext(path)
+    return f"{stem}.{VARIANT_SIZES[variant]}.{fmt}"
+
+
+def render_variants(path: str, fmt: str, quality: int) -> list[str]:
+    """
+    Decodes the image at `path` once and writes every VARIANT_SIZES rendition in `fmt`, with EXIF
+    orientation applied and no metadata. Runs in a worker process; returns the written paths.
+    """
+    with Image.open(path) as src:
+        # JPEG can decode straight at a reduced scale when the largest variant is much smaller.
+        largest = max(VARIANT_SIZES.values())
+        src.draft("RGB", (largest, largest))
+        img = ImageOps.exif_transpose(src)
+        if fmt == "jpeg" or img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGB" if fmt == "jpeg" or "A" not in img.getbands() else "RGBA")
+
+        written: list[str] = []
+        for variant, size in VARIANT_SIZES.items():
+            img.thumbnail((size, size), Image.Resampling.LANCZOS)
+            out = variant_path(path, variant, fmt)
+            # Identical uploads share a path and may be rendered twice at once.
+            part = f"{out}.{uuid.uuid4().hex}.part"
+            img.save(part, format=FORMATS[fmt], quality=quality, optimize=fmt == "jpeg")
+            os.replace(part, out)
+            written.append(out)
+        return written
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.utils.images import media_key
+
+
+def media_base_url(request: Request) -> str:
+    if settings.media_cdn_url:
+        return settings.media_cdn_url.rstrip("/")
+    base = settings.public_base_url if settings.media_use_public_base_url else str(request.base_url)
+    return f"{base.rstrip('/')}/static"
+
+
+def static_url(request: Request, file_path: str) -> str:
+    return f"{media_base_url(request)}/{media_key(settings.upload_dir, file_path)}"